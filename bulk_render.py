@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Массовая генерация обоев по потоку пользовательских конфигов
+
+Читает JSONL, где каждая строка — переопределения одного пользователя
+поверх базового конфига: {"id": "user42", "colors": {...}, "quote": {...}}.
+Рендер идет в ограниченном пуле процессов с обратным давлением: новые
+строки читаются только когда в очереди есть место, поэтому память
+не растет с длиной входа. Результаты раскладываются по шардам
+<out>/ab/cd/<id>.png, ошибки пишутся в <out>/failures.jsonl,
+в конце печатается сводка: пропускная способность, ошибки, p50/p99.
+"""
+
+import hashlib
+import io
+import json
+import math
+import os
+import re
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+# Гистограмма задержек с шагом 2%: память постоянна при любом числе задач
+_LATENCY_BASE = 1.02
+
+# Сколько раз подряд пул может сломаться без единого успешного рендера, прежде чем запуск прервется
+MAX_POOL_RESTARTS = 3
+
+
+def shard_path(out_dir: str, user_id: str) -> str:
+    """Путь вида <out>/ab/cd/<id>.png, шард берется из хэша id"""
+    digest = hashlib.sha1(user_id.encode('utf-8')).hexdigest()
+    safe_id = re.sub(r'[^A-Za-z0-9._-]', '_', user_id)[:100] or digest
+    return os.path.join(out_dir, digest[:2], digest[2:4], f"{safe_id}.png")
+
+
+class LatencyHistogram:
+    """Логарифмическая гистограмма задержек для перцентилей без хранения выборки"""
+
+    def __init__(self):
+        self.buckets: Dict[int, int] = {}
+        self.count = 0
+
+    def add(self, seconds: float):
+        bucket = math.floor(math.log(max(seconds, 1e-6)) / math.log(_LATENCY_BASE))
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+        self.count += 1
+
+    def percentile(self, p: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = math.ceil(self.count * p / 100)
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return _LATENCY_BASE ** (bucket + 1)
+        return _LATENCY_BASE ** (max(self.buckets) + 1)
+
+
+# Базовый конфиг процесса пула: передается один раз в инициализаторе, а не с каждой задачей
+_base_config: Dict[str, Any] = {}
+
+
+def _init_worker(base: Dict[str, Any]):
+    """Инициализатор процесса: запоминает базовый конфиг и глушит подробный лог генератора"""
+    global _base_config
+    _base_config = base
+    sys.stdout = io.TextIOWrapper(open(os.devnull, 'wb'), encoding='utf-8')
+
+
+def render_user(line_no: int, override: Dict[str, Any],
+                out_dir: str) -> Tuple[int, str, Optional[str], float]:
+    """Рендер одного пользователя в процессе пула: (строка, id, ошибка, секунды)"""
+    from config_compiler import compile_config_data, deep_merge
+    from generate_calendar import CalendarGenerator
+
+    started = time.perf_counter()
+    user_id = str(override.get('id', f"line{line_no}"))
+    try:
+        config = deep_merge(_base_config, {k: v for k, v in override.items() if k != 'id'})
+        config['output'] = shard_path(out_dir, user_id)
+        os.makedirs(os.path.dirname(config['output']), exist_ok=True)
+
+        generator = CalendarGenerator(settings=compile_config_data(config))
+        output = generator.generate(incremental=False)
+        if output != config['output']:
+            raise RuntimeError(f"изображение сохранено не по месту: {output}")
+        error = None
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    return line_no, user_id, error, time.perf_counter() - started
+
+
+def _read_jsonl(stream) -> Iterator[Tuple[int, Any, Optional[str]]]:
+    """Строки JSONL по одной: (номер, объект, ошибка разбора)"""
+    for line_no, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            item = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_no, None, f"JSONDecodeError: {e}"
+            continue
+        if not isinstance(item, dict):
+            yield line_no, None, "ожидался объект с переопределениями"
+            continue
+        yield line_no, item, None
+
+
+def run_bulk(base_config_path: str, input_path: str, out_dir: str,
+             workers: Optional[int] = None, max_pending: Optional[int] = None) -> bool:
+    """Массовый рендер; True, если все строки обработаны без ошибок"""
+    from config_compiler import ConfigError, compile_config_data, load_config_data
+
+    # Базовый конфиг проверяется один раз до запуска пула, а не падает в каждой строке
+    try:
+        base = load_config_data(base_config_path)
+        compile_config_data(base)
+    except OSError as e:
+        print(f"❌ Не удалось прочитать базовый конфиг {base_config_path}: {e}")
+        return False
+    except ConfigError as e:
+        print(f"❌ Базовый конфиг {base_config_path} не прошел проверку:")
+        for problem in e.errors:
+            print(f"   • {problem}")
+        return False
+
+    try:
+        stream = sys.stdin if input_path == '-' else open(input_path, 'r', encoding='utf-8')
+    except OSError as e:
+        print(f"❌ Не удалось открыть вход {input_path}: {e}")
+        return False
+
+    workers = workers or os.cpu_count() or 1
+    max_pending = max_pending or workers * 4
+    os.makedirs(out_dir, exist_ok=True)
+    failures_path = os.path.join(out_dir, "failures.jsonl")
+
+    print(f"🏭 Массовая генерация: вход {input_path}, выход {out_dir}, "
+          f"процессов {workers}, очередь до {max_pending}")
+
+    latencies = LatencyHistogram()
+    done = failed = 0
+    started = time.perf_counter()
+
+    def start_pool() -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                   initargs=(base,))
+
+    pool = start_pool()
+    broken = False
+    breaks_in_row = 0
+    aborted = False
+
+    try:
+        with stream, open(failures_path, 'w', encoding='utf-8') as failures:
+
+            def record(line_no: int, user_id: Optional[str], error: Optional[str],
+                       seconds: Optional[float] = None):
+                nonlocal done, failed, breaks_in_row
+                done += 1
+                if seconds is not None:
+                    latencies.add(seconds)
+                if error:
+                    failed += 1
+                    failures.write(json.dumps({'line': line_no, 'id': user_id, 'error': error},
+                                              ensure_ascii=False) + '\n')
+                else:
+                    breaks_in_row = 0
+                if done % 1000 == 0:
+                    rate = done / (time.perf_counter() - started)
+                    print(f"   … обработано {done}, ошибок {failed}, {rate:.1f}/с")
+
+            def drain(block_until_below: int, pending: Dict[Future, Tuple[int, str]]):
+                nonlocal broken
+                while len(pending) >= block_until_below:
+                    finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        line_no, user_id = pending.pop(future)
+                        try:
+                            result = future.result()
+                        except BrokenProcessPool as e:
+                            # Ошибкой считаются только задачи, которые были в работе у сломанного пула
+                            broken = True
+                            record(line_no, user_id, f"BrokenProcessPool: {e}")
+                        except Exception as e:
+                            record(line_no, user_id, f"{type(e).__name__}: {e}")
+                        else:
+                            record(*result)
+
+            def restart_pool(pending: Dict[Future, Tuple[int, str]]) -> bool:
+                """Замена сломанного пула новым; False, если пул ломается снова и снова"""
+                nonlocal pool, broken, breaks_in_row
+                drain(1, pending)
+                pool.shutdown(wait=False, cancel_futures=True)
+                broken = False
+                breaks_in_row += 1
+                if breaks_in_row > MAX_POOL_RESTARTS:
+                    print(f"❌ Пул процессов сломался {breaks_in_row} раз подряд без единого "
+                          f"успешного рендера, массовая генерация прервана")
+                    return False
+                print("⚠ Процесс пула аварийно завершился, пул пересоздан")
+                pool = start_pool()
+                return True
+
+            # Задача -> (строка, id), чтобы записать ошибку, даже если результата нет
+            pending: Dict[Future, Tuple[int, str]] = {}
+            for line_no, override, parse_error in _read_jsonl(stream):
+                if parse_error:
+                    record(line_no, None, parse_error)
+                    continue
+                # Обратное давление: не читаем дальше, пока очередь заполнена
+                drain(max_pending, pending)
+                user_id = str(override.get('id', f"line{line_no}"))
+                future = None
+                while future is None and not aborted:
+                    if broken and not restart_pool(pending):
+                        aborted = True
+                        break
+                    try:
+                        future = pool.submit(render_user, line_no, override, out_dir)
+                    except BrokenProcessPool:
+                        # Пул сломался между проверками: строка еще не отправлена, отправим в новый
+                        broken = True
+                if aborted:
+                    break
+                pending[future] = (line_no, user_id)
+            drain(1, pending)
+    finally:
+        pool.shutdown(wait=True)
+
+    elapsed = time.perf_counter() - started
+    print("=" * 60)
+    print(f"📊 Обработано: {done}, успешно: {done - failed}, ошибок: {failed}")
+    print(f"⏱ Время: {elapsed:.1f} с, пропускная способность: {done / elapsed if elapsed else 0:.1f} обоев/с")
+    print(f"⏱ Задержка рендера: p50 {latencies.percentile(50) * 1000:.0f} мс, "
+          f"p99 {latencies.percentile(99) * 1000:.0f} мс")
+    if failed:
+        print(f"⚠ Подробности ошибок: {failures_path}")
+    if aborted:
+        print("❌ Запуск прерван до конца входа: пул процессов не удается восстановить")
+    print("=" * 60)
+    return failed == 0 and not aborted
@@ -0,0 +1,533 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Компилятор конфигурации календаря
+
+Разбирает config.json (допускаются комментарии // и /* */ в стиле JSONC),
+проверяет его по явной схеме и собирает типизированный объект настроек
+с уже разобранными цветами и датами. Результат кэшируется на диске
+по хэшу содержимого файла, поэтому повторные запуски не разбирают
+и не проверяют конфиг заново.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from PIL import ImageColor
+
+CACHE_DIR_NAME = ".calendar_cache"
+
+ENCODINGS = ['utf-8', 'utf-8-sig', 'cp1251', 'iso-8859-1', 'koi8-r']
+
+RGB = Tuple[int, int, int]
+
+_REQUIRED = object()
+
+
+class ConfigError(ValueError):
+    """Ошибка конфигурации с точными путями до проблемных ключей"""
+
+    def __init__(self, errors: List[str]):
+        self.errors = errors
+        super().__init__("\n".join(errors))
+
+
+class ConfigSyntaxError(ConfigError):
+    """Конфиг не удалось разобрать как JSON/JSONC ни в одной кодировке"""
+
+
+class Field:
+    """Описание одного ключа схемы"""
+    __slots__ = ('kind', 'attr', 'default', 'choices', 'minimum')
+
+    def __init__(self, kind: str, attr: str, default: Any = _REQUIRED,
+                 choices: Optional[Tuple[Any, ...]] = None,
+                 minimum: Optional[float] = None):
+        self.kind = kind
+        self.attr = attr
+        self.default = default
+        self.choices = choices
+        self.minimum = minimum
+
+
+# Явная схема config.json: секция -> ключ -> Field.
+# Значения по умолчанию совпадают с прежними .get(..., default) в генераторе.
+SCHEMA: Dict[str, Dict[str, Field]] = {
+    'display': {
+        'width': Field('int', 'width', minimum=1),
+        'height': Field('int', 'height', minimum=1),
+    },
+    'layout': {
+        'top_offset': Field('int', 'top_offset'),
+        'day_radius': Field('int', 'day_radius', minimum=0),
+        'month_spacing_x': Field('int', 'month_spacing_x', 30),
+        'month_spacing_y': Field('int', 'month_spacing_y', 40),
+        'month_margin_x': Field('int', 'month_margin_x', 40),
+        'month_margin_y': Field('int', 'month_margin_y', 20),
+        'day_spacing_x': Field('int', 'day_spacing_x', 50),
+        'day_spacing_y': Field('int', 'day_spacing_y', 50),
+        'day_grid_padding_x': Field('int', 'day_grid_padding_x', 20),
+        'day_grid_padding_y': Field('int', 'day_grid_padding_y', 80),
+    },
+    'colors': {
+        'background': Field('color', 'color_background'),
+        'month_text': Field('color', 'color_month_text'),
+        'future_day': Field('color', 'color_future_day'),
+        'past_day': Field('color', 'color_past_day'),
+        'current_day': Field('color', 'color_current_day'),
+        'progress_background': Field('color', 'color_progress_background'),
+        'progress_fill': Field('color', 'color_progress_fill'),
+        'progress_text': Field('color', 'color_progress_text'),
+    },
+    'calendar': {
+        'months': Field('months', 'months'),
+        'week_start': Field('int', 'week_start', choices=tuple(range(7))),
+        'show_numbers': Field('bool', 'show_numbers', False),
+        'month_text_align': Field('str', 'month_text_align', 'left',
+                                  choices=('left', 'center', 'right')),
+    },
+    'quote': {
+        'enabled': Field('bool', 'quote_enabled', False),
+        'quotes': Field('list', 'quotes', []),
+        'text': Field('str', 'quote_text', ''),
+        'font_size': Field('int', 'quote_font_size', 42, minimum=1),
+        'color': Field('color', 'quote_color', '#FFFFFF'),
+        'align': Field('str', 'quote_align', 'center',
+                       choices=('left', 'center', 'right')),
+        'position': Field('str', 'quote_position', 'above_calendar',
+                          choices=('above_calendar', 'top_left', 'top_center', 'top_right')),
+        'margin_top': Field('int', 'quote_margin_top', 40),
+        'margin_bottom': Field('int', 'quote_margin_bottom', 20),
+        'margin_left': Field('int', 'quote_margin_left', 60),
+        'margin_right': Field('int', 'quote_margin_right', 60),
+        'max_width': Field('int', 'quote_max_width', 1200, minimum=1),
+        'line_height': Field('number', 'quote_line_height', 1.2, minimum=0),
+        'show_number': Field('bool', 'quote_show_number', False),
+    },
+    'fonts': {
+        'month_size': Field('int', 'month_font_size', minimum=1),
+        'day_size': Field('int', 'day_font_size', 20, minimum=1),
+        'progress_size': Field('int', 'progress_font_size', minimum=1),
+    },
+    'progress': {
+        'width_percent': Field('number', 'progress_width_percent', 30, minimum=0),
+        'height': Field('int', 'progress_height', 40, minimum=0),
+        'margin': Field('int', 'progress_margin', 20),
+        'position': Field('str', 'progress_position', 'center',
+                          choices=('left', 'center', 'right')),
+    },
+}
+
+# Ключи верхнего уровня, не являющиеся секциями
+TOP_LEVEL: Dict[str, Field] = {
+    'year': Field('int', 'year', None, minimum=1),
+    'output': Field('str', 'output', 'calendar.png'),
+    'highlighted_ranges': Field('ranges', 'highlighted_ranges', []),
+    'themes': Field('themes', 'themes', {}),
+}
+
+
+class CalendarSettings:
+    """Скомпилированные настройки календаря: типы проверены, цвета в RGB, даты разобраны"""
+    __slots__ = (
+        'width', 'height',
+        'top_offset', 'day_radius',
+        'month_spacing_x', 'month_spacing_y', 'month_margin_x', 'month_margin_y',
+        'day_spacing_x', 'day_spacing_y', 'day_grid_padding_x', 'day_grid_padding_y',
+        'color_background', 'color_month_text', 'color_future_day', 'color_past_day',
+        'color_current_day', 'color_progress_background', 'color_progress_fill',
+        'color_progress_text',
+        'months', 'week_start', 'show_numbers', 'month_text_align',
+        'quote_enabled', 'quotes', 'quote_text', 'quote_font_size', 'quote_color',
+        'quote_align', 'quote_position', 'quote_margin_top', 'quote_margin_bottom',
+        'quote_margin_left', 'quote_margin_right', 'quote_max_width',
+        'quote_line_height', 'quote_show_number',
+        'month_font_size', 'day_font_size', 'progress_font_size',
+        'progress_width_percent', 'progress_height', 'progress_margin', 'progress_position',
+        'year', 'output', 'highlighted_ranges', 'themes',
+    )
+
+    width: int
+    height: int
+    top_offset: int
+    day_radius: int
+    month_spacing_x: int
+    month_spacing_y: int
+    month_margin_x: int
+    month_margin_y: int
+    day_spacing_x: int
+    day_spacing_y: int
+    day_grid_padding_x: int
+    day_grid_padding_y: int
+    color_background: RGB
+    color_month_text: RGB
+    color_future_day: RGB
+    color_past_day: RGB
+    color_current_day: RGB
+    color_progress_background: RGB
+    color_progress_fill: RGB
+    color_progress_text: RGB
+    months: Tuple[str, ...]
+    week_start: int
+    show_numbers: bool
+    month_text_align: str
+    quote_enabled: bool
+    quotes: list
+    quote_text: str
+    quote_font_size: int
+    quote_color: RGB
+    quote_align: str
+    quote_position: str
+    quote_margin_top: int
+    quote_margin_bottom: int
+    quote_margin_left: int
+    quote_margin_right: int
+    quote_max_width: int
+    quote_line_height: float
+    quote_show_number: bool
+    month_font_size: int
+    day_font_size: int
+    progress_font_size: int
+    progress_width_percent: float
+    progress_height: int
+    progress_margin: int
+    progress_position: str
+    year: Optional[int]
+    output: str
+    highlighted_ranges: Tuple[Tuple[date, date, RGB], ...]
+    themes: Dict[str, Dict[str, Any]]
+
+    @property
+    def colors(self) -> Dict[str, RGB]:
+        """Цвета по семантическим ролям, как в секции colors"""
+        return {name: getattr(self, field.attr) for name, field in SCHEMA['colors'].items()}
+
+
+def parse_color(value: str) -> RGB:
+    """Перевод цвета (#RGB, #RRGGBB, #RRGGBBAA, имя) в RGB-кортеж; альфа отбрасывается"""
+    return tuple(ImageColor.getrgb(value)[:3])
+
+
+def strip_json_comments(text: str) -> str:
+    """Удаление комментариев // и /* */ и висячих запятых вне строк.
+
+    Комментарии заменяются пробелами с сохранением переводов строк,
+    чтобы позиции в сообщениях json об ошибках оставались верными.
+    """
+    out = []
+    i = 0
+    n = len(text)
+    last_comma = -1  # индекс в out последней запятой, после которой пока только пробелы
+    while i < n:
+        ch = text[i]
+        if ch == '"':
+            j = i + 1
+            while j < n and text[j] != '"':
+                j += 2 if text[j] == '\\' else 1
+            out.append(text[i:j + 1])
+            i = j + 1
+            last_comma = -1
+            continue
+        if ch == '/' and i + 1 < n and text[i + 1] == '/':
+            j = text.find('\n', i)
+            j = n if j == -1 else j
+            out.append(' ' * (j - i))
+            i = j
+            continue
+        if ch == '/' and i + 1 < n and text[i + 1] == '*':
+            j = text.find('*/', i + 2)
+            j = n if j == -1 else j + 2
+            out.append(''.join(c if c == '\n' else ' ' for c in text[i:j]))
+            i = j
+            continue
+        if ch in '}]' and last_comma >= 0:
+            out[last_comma] = ' '
+        if ch == ',':
+            last_comma = len(out)
+        elif not ch.isspace():
+            last_comma = -1
+        out.append(ch)
+        i += 1
+    return ''.join(out)
+
+
+def parse_config_bytes(raw: bytes) -> Dict[str, Any]:
+    """Разбор содержимого конфига с перебором кодировок"""
+    problems = []
+    for encoding in ENCODINGS:
+        try:
+            text = raw.decode(encoding)
+        except UnicodeDecodeError as e:
+            problems.append(f"❌ Ошибка кодировки {encoding}: {e}")
+            continue
+        try:
+            config = json.loads(strip_json_comments(text))
+        except json.JSONDecodeError as e:
+            problems.append(f"❌ Ошибка JSON при кодировке {encoding}: {e}")
+            continue
+        if not isinstance(config, dict):
+            raise ConfigError([f"$: ожидался объект, получено {type(config).__name__}"])
+        print(f"✅ Конфиг успешно разобран с кодировкой: {encoding}")
+        return config
+    raise ConfigSyntaxError(problems)
+
+
+def deep_merge(base: Dict[str, Any], override: Dict[str, Any]) -> Dict[str, Any]:
+    """Рекурсивное слияние словарей; списки и значения заменяются целиком"""
+    merged = dict(base)
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = deep_merge(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def load_config_data(config_path: str) -> Dict[str, Any]:
+    """Чтение конфига в словарь без проверки схемы (например, как основы для слияния)"""
+    with open(config_path, 'rb') as f:
+        return parse_config_bytes(f.read())
+
+
+def _check_value(field: Field, value: Any, path: str, errors: List[str]) -> Any:
+    """Проверка и преобразование одного значения; ошибки копятся в errors"""
+    kind = field.kind
+    if kind == 'int':
+        if isinstance(value, bool) or not isinstance(value, int):
+            errors.append(f"{path}: ожидалось целое число, получено {value!r}")
+            return None
+    elif kind == 'number':
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            errors.append(f"{path}: ожидалось число, получено {value!r}")
+            return None
+    elif kind == 'bool':
+        if not isinstance(value, bool):
+            errors.append(f"{path}: ожидалось true/false, получено {value!r}")
+            return None
+    elif kind == 'str':
+        if not isinstance(value, str):
+            errors.append(f"{path}: ожидалась строка, получено {value!r}")
+            return None
+    elif kind == 'list':
+        if not isinstance(value, list):
+            errors.append(f"{path}: ожидался список, получено {value!r}")
+            return None
+        return list(value)
+    elif kind == 'color':
+        if not isinstance(value, str):
+            errors.append(f"{path}: ожидался цвет строкой, получено {value!r}")
+            return None
+        try:
+            return parse_color(value)
+        except ValueError:
+            errors.append(f"{path}: неизвестный цвет {value!r}")
+            return None
+    elif kind == 'months':
+        if not isinstance(value, list) or len(value) != 12:
+            errors.append(f"{path}: ожидался список из 12 названий месяцев, получено {value!r}")
+            return None
+        for i, name in enumerate(value):
+            if not isinstance(name, str):
+                errors.append(f"{path}[{i}]: ожидалась строка, получено {name!r}")
+        return tuple(value)
+    elif kind == 'ranges':
+        return _check_ranges(value, path, errors)
+    elif kind == 'themes':
+        return _check_themes(value, path, errors)
+
+    if field.choices is not None and value not in field.choices:
+        allowed = ', '.join(str(c) for c in field.choices)
+        errors.append(f"{path}: недопустимое значение {value!r} (допустимо: {allowed})")
+        return None
+    if field.minimum is not None and value < field.minimum:
+        errors.append(f"{path}: значение {value!r} меньше минимума {field.minimum}")
+        return None
+    return value
+
+
+def _parse_date(value: Any, path: str, errors: List[str]) -> Optional[date]:
+    if not isinstance(value, str):
+        errors.append(f"{path}: ожидалась дата YYYY-MM-DD, получено {value!r}")
+        return None
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        errors.append(f"{path}: неверная дата {value!r} (формат YYYY-MM-DD)")
+        return None
+
+
+def _check_ranges(value: Any, path: str, errors: List[str]) -> Tuple:
+    """Проверка highlighted_ranges: {date, color} или {start, end, color}"""
+    if not isinstance(value, list):
+        errors.append(f"{path}: ожидался список, получено {value!r}")
+        return ()
+    ranges = []
+    for i, item in enumerate(value):
+        item_path = f"{path}[{i}]"
+        if not isinstance(item, dict):
+            errors.append(f"{item_path}: ожидался объект, получено {item!r}")
+            continue
+        if 'date' in item:
+            start = end = _parse_date(item['date'], f"{item_path}.date", errors)
+        else:
+            for key in ('start', 'end'):
+                if key not in item:
+                    errors.append(f"{item_path}.{key}: обязательное поле (или укажите date)")
+            start = _parse_date(item['start'], f"{item_path}.start", errors) if 'start' in item else None
+            end = _parse_date(item['end'], f"{item_path}.end", errors) if 'end' in item else None
+        if 'color' not in item:
+            errors.append(f"{item_path}.color: обязательное поле")
+            continue
+        color = _check_value(Field('color', 'color'), item['color'], f"{item_path}.color", errors)
+        if start is not None and end is not None and color is not None:
+            if start > end:
+                errors.append(f"{item_path}: start {start} позже end {end}")
+                continue
+            ranges.append((start, end, color))
+    return tuple(ranges)
+
+
+def _check_themes(value: Any, path: str, errors: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Проверка themes: имя темы -> цвета ролей (ключи colors, quote, highlights)"""
+    if not isinstance(value, dict):
+        errors.append(f"{path}: ожидался объект, получено {value!r}")
+        return {}
+    color_field = Field('color', 'color')
+    allowed = set(SCHEMA['colors']) | {'quote', 'highlights'}
+    themes = {}
+    for name, theme in value.items():
+        theme_path = f"{path}.{name}"
+        if not isinstance(theme, dict):
+            errors.append(f"{theme_path}: ожидался объект, получено {theme!r}")
+            continue
+        roles = {}
+        for role, color in theme.items():
+            role_path = f"{theme_path}.{role}"
+            if role not in allowed:
+                errors.append(f"{role_path}: неизвестная роль (допустимо: {', '.join(sorted(allowed))})")
+            elif role == 'highlights' and isinstance(color, list):
+                roles[role] = tuple(_check_value(color_field, c, f"{role_path}[{i}]", errors)
+                                    for i, c in enumerate(color))
+            else:
+                roles[role] = _check_value(color_field, color, role_path, errors)
+        themes[name] = roles
+    return themes
+
+
+def _apply_field(settings: CalendarSettings, field: Field, container: Dict[str, Any],
+                 key: str, path: str, errors: List[str]):
+    if key in container:
+        value = _check_value(field, container[key], path, errors)
+    elif field.default is _REQUIRED:
+        errors.append(f"{path}: обязательное поле отсутствует")
+        value = None
+    elif field.kind in ('color', 'ranges', 'list', 'themes'):
+        value = _check_value(field, field.default, path, errors)
+    else:
+        value = field.default
+    setattr(settings, field.attr, value)
+
+
+def compile_config_data(config: Dict[str, Any]) -> CalendarSettings:
+    """Проверка словаря конфига по схеме и сборка CalendarSettings"""
+    errors: List[str] = []
+    settings = CalendarSettings()
+
+    for section_name, fields in SCHEMA.items():
+        section = config.get(section_name, {})
+        if not isinstance(section, dict):
+            errors.append(f"{section_name}: ожидался объект, получено {section!r}")
+            section = {}
+        for key, field in fields.items():
+            _apply_field(settings, field, section, key, f"{section_name}.{key}", errors)
+        for key in section:
+            if key not in fields:
+                print(f"⚠ Неизвестный ключ конфига {section_name}.{key} пропущен")
+
+    for key, field in TOP_LEVEL.items():
+        _apply_field(settings, field, config, key, key, errors)
+
+    for key in config:
+        if key not in SCHEMA and key not in TOP_LEVEL:
+            print(f"⚠ Неизвестный ключ конфига {key} пропущен")
+
+    if errors:
+        raise ConfigError(errors)
+    return settings
+
+
+def _compiler_fingerprint() -> bytes:
+    """Отпечаток компилятора для ключа кэша.
+
+    Включает исходник модуля, описание схемы и слоты CalendarSettings,
+    поэтому правка умолчаний, проверок или набора настроек сама делает
+    старый кэш недействительным — номер версии вручную менять не нужно.
+    """
+    h = hashlib.sha256()
+    try:
+        with open(__file__, 'rb') as f:
+            h.update(f.read())
+    except OSError:
+        pass
+    fields = {**{f"{section}.{key}": field for section, fields in SCHEMA.items()
+                 for key, field in fields.items()}, **TOP_LEVEL}
+    h.update(repr(sorted(
+        (path, field.kind, field.attr,
+         'required' if field.default is _REQUIRED else repr(field.default),
+         field.choices, field.minimum)
+        for path, field in fields.items()
+    )).encode('utf-8'))
+    h.update(repr(CalendarSettings.__slots__).encode('utf-8'))
+    return h.digest()
+
+
+_COMPILER_FINGERPRINT = _compiler_fingerprint()
+
+
+def _is_complete(settings: Any) -> bool:
+    """Объект из кэша — настройки, в которых заполнены все слоты"""
+    return isinstance(settings, CalendarSettings) and \
+        all(hasattr(settings, slot) for slot in CalendarSettings.__slots__)
+
+
+def compile_config(config_path: str, cache_dir: Optional[str] = None) -> CalendarSettings:
+    """Компиляция конфига с дисковым кэшем по хэшу содержимого и компилятора"""
+    with open(config_path, 'rb') as f:
+        raw = f.read()
+
+    digest = hashlib.sha256(_COMPILER_FINGERPRINT + raw).hexdigest()[:32]
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(os.path.abspath(config_path)), CACHE_DIR_NAME)
+    prefix = os.path.basename(config_path) + '-'
+    cache_path = os.path.join(cache_dir, f"{prefix}{digest}.pickle")
+
+    try:
+        with open(cache_path, 'rb') as f:
+            settings = pickle.load(f)
+        if _is_complete(settings):
+            print(f"⚡ Конфиг взят из кэша: {cache_path}")
+            return settings
+    except (OSError, pickle.PickleError, EOFError, AttributeError, TypeError):
+        pass
+
+    settings = compile_config_data(parse_config_bytes(raw))
+
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = cache_path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(settings, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+        # Старые версии того же конфига больше не нужны
+        for name in os.listdir(cache_dir):
+            if name.startswith(prefix) and name.endswith('.pickle') and \
+                    os.path.join(cache_dir, name) != cache_path:
+                os.remove(os.path.join(cache_dir, name))
+    except OSError as e:
+        print(f"⚠ Не удалось записать кэш конфига: {e}")
+
+    return settings
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Список отрисовки (display list) между раскладкой и растеризацией
+
+compile_display_list один раз переводит раскладку календаря в плоский
+список примитивов (прямоугольник, кружок, текст) с уже вычисленными
+координатами и RGB-цветами; каждый примитив помнит и семантическую
+роль цвета (past_day, month_text, ...), чтобы его можно было перекрасить
+без повторной раскладки. Дальше этот список исполняют бэкенды:
+Pillow (целиком, по области или полосами), SVG. Два списка можно
+сравнить: diff_display_lists возвращает грязные прямоугольники,
+а одинаковые списки означают, что перерисовывать нечего.
+"""
+
+from typing import Callable, Iterable, List, NamedTuple, Optional, Tuple
+
+from PIL import Image, ImageDraw
+
+from config_compiler import parse_color
+
+RGB = Tuple[int, int, int]
+BBox = Tuple[int, int, int, int]  # x0, y0, x1, y1 включительно
+
+# Загрузчик шрифта по размеру, обычно CalendarGenerator.get_font
+FontLoader = Callable[[int], object]
+
+
+class Rect(NamedTuple):
+    """Прямоугольник с включительными границами, как ImageDraw.rectangle"""
+    x0: int
+    y0: int
+    x1: int
+    y1: int
+    color: RGB
+    role: str = ''
+    month: Optional[int] = None  # индекс месяца, к которому относится примитив
+
+    @property
+    def bbox(self) -> BBox:
+        return self.x0, self.y0, self.x1, self.y1
+
+
+class Circle(NamedTuple):
+    """Кружок дня: пиксели [c - r, c + r] включительно"""
+    cx: int
+    cy: int
+    r: int
+    color: RGB
+    role: str = ''
+    month: Optional[int] = None
+
+    @property
+    def bbox(self) -> BBox:
+        return self.cx - self.r, self.cy - self.r, self.cx + self.r, self.cy + self.r
+
+
+class Text(NamedTuple):
+    """Текст с точкой привязки Pillow и рамкой по метрикам шрифта"""
+    x: int
+    y: int
+    text: str
+    size: int
+    color: RGB
+    anchor: Optional[str]
+    bbox: BBox
+    role: str = ''
+    month: Optional[int] = None
+
+
+class DisplayList:
+    """Скомпилированный кадр: размер, фон, шрифт и примитивы в порядке отрисовки"""
+    __slots__ = ('width', 'height', 'background', 'font', 'items')
+
+    def __init__(self, width: int, height: int, background: RGB, font: str,
+                 items: Iterable = ()):
+        self.width = width
+        self.height = height
+        self.background = background
+        self.font = font
+        self.items = tuple(items)
+
+    def key(self) -> tuple:
+        return self.width, self.height, self.background, self.font, self.items
+
+    def __eq__(self, other):
+        return isinstance(other, DisplayList) and self.key() == other.key()
+
+    def __hash__(self):
+        return hash(self.key())
+
+    def __getstate__(self):
+        return self.key()
+
+    def __setstate__(self, state):
+        self.width, self.height, self.background, self.font, self.items = state
+
+
+def _text(get_font: FontLoader, size: int, x: int, y: int, text: str, color, role: str,
+          anchor: Optional[str] = None, month: Optional[int] = None) -> Text:
+    left, top, right, bottom = get_font(size).getbbox(text, anchor=anchor)
+    return Text(x, y, text, size, color, anchor,
+                (x + left, y + top, x + right, y + bottom), role, month)
+
+
+def compile_display_list(generator) -> DisplayList:
+    """Перевод раскладки генератора в список отрисовки"""
+    g = generator
+    font = g.get_font(g.month_font_size)
+    items = []
+
+    if g.quote_enabled and g.selected_quote:
+        for x, y, line in g.layout_quote(g.get_font(g.quote_font_size)):
+            items.append(_text(g.get_font, g.quote_font_size, x, y, line, g.quote_color, 'quote'))
+        number = g.layout_quote_number(g.get_font(g.quote_font_size // 2))
+        if number:
+            x, y, text = number
+            items.append(_text(g.get_font, g.quote_font_size // 2, x, y, text, g.quote_color,
+                               'quote'))
+
+    cols, rows, month_width, month_height = g.calculate_month_dimensions()
+    for i in range(12):
+        x0, y0 = g.month_origin(i, cols, month_width, month_height)
+        text_x, text_y, anchor = g.month_label_position(x0, y0, month_width)
+        items.append(_text(g.get_font, g.month_font_size, text_x, text_y, g.months[i],
+                           g.colors['month_text'], 'month_text', anchor, i))
+
+        for current_date, cx, cy in g.layout_days(i, x0, y0, month_width):
+            role = g.get_day_role(current_date)
+            color = g.role_color(role)
+            items.append(Circle(cx, cy, g.day_radius, color, role, i))
+            if g.show_numbers:
+                items.append(_text(g.get_font, g.day_font_size, cx, cy, str(current_date.day),
+                                   parse_color(g.day_text_color(color)), f"day_number:{role}",
+                                   "mm", i))
+
+    bar_x, bar_y, bar_width, filled_width, text_x, text_y, text = \
+        g.layout_progress(g.progress_y, g.get_font(g.progress_font_size))
+    bar_bottom = bar_y + g.progress_height
+    items.append(Rect(bar_x, bar_y, bar_x + bar_width, bar_bottom,
+                      g.colors['progress_background'], 'progress_background'))
+    items.append(Rect(bar_x, bar_y, bar_x + filled_width, bar_bottom,
+                      g.colors['progress_fill'], 'progress_fill'))
+    items.append(_text(g.get_font, g.progress_font_size, text_x, text_y, text,
+                       g.colors['progress_text'], 'progress_text'))
+
+    font_path = getattr(font, 'path', None)
+    return DisplayList(g.width, g.height, g.colors['background'],
+                       font_path if isinstance(font_path, str) else 'default', items)
+
+
+def _intersects(a: BBox, b: BBox) -> bool:
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+
+def _merge_rects(rects: List[BBox]) -> List[BBox]:
+    """Объединение пересекающихся прямоугольников до устойчивого набора"""
+    merged: List[BBox] = []
+    for rect in rects:
+        while True:
+            for i, other in enumerate(merged):
+                if _intersects(rect, other):
+                    rect = (min(rect[0], other[0]), min(rect[1], other[1]),
+                            max(rect[2], other[2]), max(rect[3], other[3]))
+                    del merged[i]
+                    break
+            else:
+                break
+        merged.append(rect)
+    return merged
+
+
+def diff_display_lists(old: DisplayList, new: DisplayList) -> List[BBox]:
+    """Грязные прямоугольники между кадрами; пустой список — кадры одинаковы"""
+    if (old.width, old.height, old.background, old.font) != \
+            (new.width, new.height, new.background, new.font):
+        return [(0, 0, new.width - 1, new.height - 1)]
+
+    old_items = set(old.items)
+    new_items = set(new.items)
+    changed = [item.bbox for item in old.items if item not in new_items]
+    changed += [item.bbox for item in new.items if item not in old_items]
+
+    # Рамка текста считается по метрикам, сглаживание может задеть соседний пиксель
+    changed = [(max(x0 - 1, 0), max(y0 - 1, 0),
+                min(x1 + 1, new.width - 1), min(y1 + 1, new.height - 1))
+               for x0, y0, x1, y1 in changed]
+    return _merge_rects([r for r in changed if r[0] <= r[2] and r[1] <= r[3]])
+
+
+def draw_items(draw: ImageDraw.ImageDraw, items: Iterable, get_font: FontLoader,
+               dx: int = 0, dy: int = 0):
+    """Исполнение примитивов на ImageDraw со сдвигом начала координат"""
+    for item in items:
+        if isinstance(item, Circle):
+            x0, y0, x1, y1 = item.bbox
+            draw.ellipse([x0 - dx, y0 - dy, x1 - dx, y1 - dy], fill=item.color)
+        elif isinstance(item, Rect):
+            draw.rectangle([item.x0 - dx, item.y0 - dy, item.x1 - dx, item.y1 - dy],
+                           fill=item.color)
+        else:
+            try:
+                draw.text((item.x - dx, item.y - dy), item.text, fill=item.color,
+                          font=get_font(item.size), anchor=item.anchor)
+            except Exception as e:
+                print(f"❌ Ошибка при отрисовке текста '{item.text[:30]}': {e}")
+
+
+def rasterize(display_list: DisplayList, get_font: FontLoader) -> Image.Image:
+    """Pillow-бэкенд: весь кадр"""
+    image = Image.new('RGB', (display_list.width, display_list.height),
+                      color=display_list.background)
+    draw_items(ImageDraw.Draw(image), display_list.items, get_font)
+    return image
+
+
+def rasterize_region(display_list: DisplayList, get_font: FontLoader,
+                     rect: BBox) -> Image.Image:
+    """Pillow-бэкенд: только прямоугольник rect (для грязных областей и полос)"""
+    x0, y0, x1, y1 = rect
+    tile = Image.new('RGB', (x1 - x0 + 1, y1 - y0 + 1), color=display_list.background)
+    items = (item for item in display_list.items if _intersects(item.bbox, rect))
+    draw_items(ImageDraw.Draw(tile), items, get_font, x0, y0)
+    return tile
+
+
+def repaint(image: Image.Image, display_list: DisplayList, get_font: FontLoader,
+            dirty: List[BBox]) -> Image.Image:
+    """Перерисовка грязных прямоугольников поверх предыдущего кадра"""
+    for rect in dirty:
+        image.paste(rasterize_region(display_list, get_font, rect), rect[:2])
+    return image
@@ -5,19 +5,131 @@
 Исправленная версия с поддержкой кириллицы
 """
 
+import argparse
+import hashlib
+import io
 import json
 import os
+import pickle
 import sys
-from datetime import datetime, date, timedelta
-from PIL import Image, ImageDraw, ImageFont
+from datetime import date, timedelta
+from PIL import Image, ImageFont
 from typing import List, Dict, Tuple, Optional
 import textwrap
 import math
+import time
 import locale
 
+from config_compiler import (
+    CACHE_DIR_NAME, CalendarSettings, ConfigError, ConfigSyntaxError,
+    compile_config, compile_config_data,
+)
+from display_list import (
+    DisplayList, compile_display_list, diff_display_lists, rasterize, repaint,
+)
+
+DEFAULT_CONFIG_PATH = "config.json"
+
+def relative_luminance(rgb: Tuple[int, int, int]) -> float:
+    """Относительная яркость цвета по WCAG: 0 — черный, 1 — белый"""
+    def channel(value: int) -> float:
+        c = value / 255
+        return c / 12.92 if c <= 0.03928 else ((c + 0.055) / 1.055) ** 2.4
+
+    r, g, b = (channel(v) for v in rgb)
+    return 0.2126 * r + 0.7152 * g + 0.0722 * b
+
+def default_config() -> Dict:
+    """Конфиг по умолчанию (используется при отсутствии config.json)"""
+    return {
+        "display": {
+            "width": 1320,
+            "height": 2868
+        },
+        "layout": {
+            "top_offset": 300,
+            "day_radius": 22,
+            "month_spacing_x": 30,
+            "month_spacing_y": 40,
+            "month_margin_x": 40,
+            "month_margin_y": 20,
+            "day_spacing_x": 50,
+            "day_spacing_y": 50,
+            "day_grid_padding_x": 20,
+            "day_grid_padding_y": 80
+        },
+        "colors": {
+            "background": "#000000",
+            "month_text": "#FFFFFF",
+            "future_day": "#333333",
+            "past_day": "#FFFFFF",
+            "current_day": "#90EE90",
+            "progress_background": "#333333",
+            "progress_fill": "#4CAF50",
+            "progress_text": "#FFFFFF"
+        },
+        "calendar": {
+            "months": [
+                "Янв", "Фев", "Мар", "Апр",
+                "Май", "Июн", "Июл", "Авг",
+                "Сен", "Окт", "Ноя", "Дек"
+            ],
+            "week_start": 0,
+            "show_numbers": False,
+            "month_text_align": "left"
+        },
+        "quote": {
+            "enabled": True,
+            "text": "Сегодня — идеальный день, чтобы сделать шаг к мечте",
+            "quotes": [
+                "Маленькие шаги каждый день приводят к большим результатам",
+                "Успех — это сумма маленьких усилий, повторяющихся изо дня в день",
+                "Лучший способ предсказать будущее — создать его",
+                "Не откладывай на завтра то, что можешь сделать сегодня",
+                "Каждый день — новая возможность изменить свою жизнь"
+            ],
+            "font_size": 42,
+            "color": "#FFFFFF",
+            "align": "center",
+            "position": "above_calendar",
+            "margin_top": 40,
+            "margin_bottom": 20,
+            "margin_left": 60,
+            "margin_right": 60,
+            "max_width": 1200,
+            "line_height": 1.2,
+            "show_number": False
+        },
+        "fonts": {
+            "month_size": 48,
+            "day_size": 20,
+            "progress_size": 36
+        },
+        "progress": {
+            "width_percent": 30,
+            "height": 40,
+            "margin": 20,
+            "position": "center"
+        },
+        "highlighted_ranges": [],
+        "output": "calendar.png"
+    }
+
 class CalendarGenerator:
-    def __init__(self, config_path: str = "config.json"):
-        """Инициализация с конфигурационным файлом"""
+    # Шрифты зависят только от размера, поэтому кэш общий для всех генераторов процесса
+    font_cache: Dict[int, object] = {}
+    
+    def __init__(self, config_path: str = DEFAULT_CONFIG_PATH,
+                 settings: Optional[CalendarSettings] = None,
+                 today: Optional[date] = None,
+                 create_missing: bool = True):
+        """Инициализация с конфигурационным файлом или готовыми настройками.
+        
+        today задает отображаемый день явно (для воспроизводимых рендеров),
+        по умолчанию берется завтрашняя дата. При create_missing=False
+        отсутствующий или нечитаемый конфиг не заменяется настройками
+        по умолчанию, а приводит к ConfigError.
+        """
         # Проверяем кодировку
         print(f"🐍 Python версия: {sys.version}")
         print(f"🔤 Кодировка по умолчанию: {sys.getdefaultencoding()}")
@@ -26,19 +138,29 @@ class CalendarGenerator:
         # Устанавливаем локаль для корректной работы с UTF-8
         self.setup_locale()
         
-        if not os.path.exists(config_path):
-            print("⚠ Конфиг не найден, создаю файл config.json")
-            self.create_default_config()
-        
-        print(f"📂 Текущая директория: {os.getcwd()}")
-        print(f"📄 Проверяю файл конфигурации: {config_path}")
-        
-        # Загружаем конфиг с правильной кодировкой
-        self.config = self.load_config_with_encoding(config_path)
+        if settings is not None:
+            config_path = "<настройки переданы напрямую>"
+            self.settings = settings
+        else:
+            if not os.path.exists(config_path):
+                if not create_missing:
+                    print(f"❌ Конфиг не найден: {config_path}")
+                    raise ConfigError([f"{config_path}: файл конфига не найден"])
+                print(f"⚠ Конфиг не найден, создаю файл {config_path}")
+                self.create_default_config(config_path)
+            
+            print(f"📂 Текущая директория: {os.getcwd()}")
+            print(f"📄 Проверяю файл конфигурации: {config_path}")
+            
+            # Компилируем конфиг (проверка схемы, кэш на диске)
+            self.settings = self.load_settings(config_path, create_missing)
         
         self.validate_and_apply_config()
-        self.today = date.today()+ timedelta(days=1)
-        self.year = self.config.get('year', self.today.year)
+        self.display_list = None
+        # Как PNG был получен последним generate(): 'full', 'partial' или 'skipped'
+        self.render_mode = None
+        self.today = today if today is not None else date.today() + timedelta(days=1)
+        self.year = self.settings.year or self.today.year
         self.calculate_progress()
         
         # Выбираем фразу дня на основе дня года
@@ -53,34 +175,6 @@ class CalendarGenerator:
         # Тестируем шрифты
         self.test_fonts()
     
-    def load_config_with_encoding(self, config_path):
-        """Загрузка конфига с попыткой разных кодировок"""
-        encodings = ['utf-8', 'utf-8-sig', 'cp1251', 'iso-8859-1', 'koi8-r']
-        
-        for encoding in encodings:
-            try:
-                with open(config_path, 'r', encoding=encoding) as f:
-                    config = json.load(f)
-                print(f"✅ Конфиг успешно загружен с кодировкой: {encoding}")
-                
-                # Проверяем, что месяцы читаются правильно
-                months = config.get('calendar', {}).get('months', [])
-                if months:
-                    print(f"📅 Месяцы в конфиге: {months}")
-                    for i, month in enumerate(months):
-                        print(f"   {i+1}. '{month}' (длина: {len(month)}, первый символ код: {ord(month[0]) if month else 'N/A'})")
-                
-                return config
-            except UnicodeDecodeError as e:
-                print(f"❌ Ошибка кодировки {encoding}: {e}")
-                continue
-            except json.JSONDecodeError as e:
-                print(f"❌ Ошибка JSON при кодировке {encoding}: {e}")
-                continue
-        
-        print("❌ Не удалось загрузить конфиг ни в одной кодировке, создаю новый")
-        return self.create_default_config()
-    
     def setup_locale(self):
         """Настройка локали для корректной работы с UTF-8"""
         try:
@@ -97,19 +191,41 @@ class CalendarGenerator:
         if hasattr(sys.stdout, 'reconfigure'):
             sys.stdout.reconfigure(encoding='utf-8')
     
+    def load_settings(self, config_path: str, create_missing: bool = True) -> CalendarSettings:
+        """Компиляция конфига (JSON/JSONC) в проверенные настройки с кэшем"""
+        try:
+            settings = compile_config(config_path)
+        except ConfigSyntaxError as e:
+            for problem in e.errors:
+                print(problem)
+            if not create_missing:
+                print(f"❌ Не удалось разобрать конфиг {config_path} ни в одной кодировке")
+                raise
+            print("❌ Не удалось загрузить конфиг ни в одной кодировке, создаю новый")
+            settings = compile_config_data(self.create_default_config(config_path))
+        except ConfigError as e:
+            print(f"❌ Конфиг {config_path} не прошел проверку:")
+            for problem in e.errors:
+                print(f"   • {problem}")
+            raise
+        
+        # Проверяем, что месяцы читаются правильно
+        print(f"📅 Месяцы в конфиге: {list(settings.months)}")
+        return settings
+    
     def validate_and_apply_config(self):
-        """Валидация и применение конфига"""
-        self.width = self.config['display']['width']
-        self.height = self.config['display']['height']
-        self.top_offset = self.config['layout']['top_offset']
+        """Применение скомпилированных настроек"""
+        settings = self.settings
+        self.width = settings.width
+        self.height = settings.height
+        self.top_offset = settings.top_offset
         
         # Настройки фразы дня
-        quote_config = self.config.get('quote', {})
-        self.quote_enabled = quote_config.get('enabled', False)
+        self.quote_enabled = settings.quote_enabled
         
         # Загружаем список фраз
-        self.quotes_list = quote_config.get('quotes', [])
-        self.single_quote = quote_config.get('text', '')
+        self.quotes_list = settings.quotes
+        self.single_quote = settings.quote_text
         
         # ВАЖНО: Проверяем и исправляем фразы
         self.validate_and_fix_quotes()
@@ -123,77 +239,78 @@ class CalendarGenerator:
             print("⚠ Нет фраз в конфиге, создаем тестовые")
             self.quotes_list = ["Тестовая фраза для проверки"]
         
-        self.quote_font_size = quote_config.get('font_size', 42)
-        self.quote_color = quote_config.get('color', '#FFFFFF')
-        self.quote_align = quote_config.get('align', 'center')
-        self.quote_position = quote_config.get('position', 'above_calendar')
+        self.quote_font_size = settings.quote_font_size
+        self.quote_color = settings.quote_color
+        self.quote_align = settings.quote_align
+        self.quote_position = settings.quote_position
         
         # НАСТРОЙКИ ОТСТУПОВ ДЛЯ ФРАЗЫ
-        self.quote_margin_top = quote_config.get('margin_top', 40)
-        self.quote_margin_bottom = quote_config.get('margin_bottom', 20)
-        self.quote_margin_left = quote_config.get('margin_left', 60)
-        self.quote_margin_right = quote_config.get('margin_right', 60)
+        self.quote_margin_top = settings.quote_margin_top
+        self.quote_margin_bottom = settings.quote_margin_bottom
+        self.quote_margin_left = settings.quote_margin_left
+        self.quote_margin_right = settings.quote_margin_right
         
         # Автоматический расчет максимальной ширины текста
         self.quote_max_width = min(
-            quote_config.get('max_width', 1200),
+            settings.quote_max_width,
             self.width - self.quote_margin_left - self.quote_margin_right
         )
         
-        self.quote_line_height = quote_config.get('line_height', 1.2)
-        self.quote_show_number = quote_config.get('show_number', False)
+        self.quote_line_height = settings.quote_line_height
+        self.quote_show_number = settings.quote_show_number
         
         # Календарь всегда начинается с top_offset
         self.effective_top_offset = self.top_offset
         
         # Отступы между месяцами
-        self.month_spacing_x = self.config['layout'].get('month_spacing_x', 30)
-        self.month_spacing_y = self.config['layout'].get('month_spacing_y', 40)
+        self.month_spacing_x = settings.month_spacing_x
+        self.month_spacing_y = settings.month_spacing_y
         
         # Отступы от краев экрана до сетки месяцев
-        self.month_margin_x = self.config['layout'].get('month_margin_x', 40)
-        self.month_margin_y = self.config['layout'].get('month_margin_y', 20)
+        self.month_margin_x = settings.month_margin_x
+        self.month_margin_y = settings.month_margin_y
         
         # Параметры расположения кружков
-        self.day_radius = self.config['layout']['day_radius']
+        self.day_radius = settings.day_radius
         
         # Расстояния между кружками
-        self.day_spacing_x = self.config['layout'].get('day_spacing_x', 50)
-        self.day_spacing_y = self.config['layout'].get('day_spacing_y', 50)
+        self.day_spacing_x = settings.day_spacing_x
+        self.day_spacing_y = settings.day_spacing_y
         
         # Отступы сетки кружков внутри месяца
-        self.day_grid_padding_x = self.config['layout'].get('day_grid_padding_x', 20)
-        self.day_grid_padding_y = self.config['layout'].get('day_grid_padding_y', 80)
+        self.day_grid_padding_x = settings.day_grid_padding_x
+        self.day_grid_padding_y = settings.day_grid_padding_y
         
-        # Цвета
-        self.colors = self.config['colors']
+        # Цвета (уже в RGB)
+        self.colors = settings.colors
         
         # Настройки календаря
-        self.months = self.config['calendar']['months']
-        self.week_start = self.config['calendar']['week_start']
-        self.show_numbers = self.config['calendar'].get('show_numbers', False)
-        self.month_text_align = self.config['calendar'].get('month_text_align', 'left')
+        self.months = settings.months
+        self.week_start = settings.week_start
+        self.show_numbers = settings.show_numbers
+        self.month_text_align = settings.month_text_align
+        
+        # Шрифты
+        self.month_font_size = settings.month_font_size
+        self.day_font_size = settings.day_font_size
+        self.progress_font_size = settings.progress_font_size
         
         # Настройки прогресс-бара
-        self.progress_width_percent = self.config['progress'].get('width_percent', 30)
-        self.progress_height = self.config['progress'].get('height', 40)
-        self.progress_margin = self.config['progress'].get('margin', 20)
-        self.progress_position = self.config['progress'].get('position', 'center')
-        
-        # Дни для выделения
-        self.highlighted_dates = []
-        for date_range in self.config.get('highlighted_ranges', []):
-            if 'date' in date_range:
-                d = datetime.strptime(date_range['date'], '%Y-%m-%d').date()
-                self.highlighted_dates.append({
-                    'start': d, 'end': d, 'color': date_range['color']
-                })
-            else:
-                start = datetime.strptime(date_range['start'], '%Y-%m-%d').date()
-                end = datetime.strptime(date_range['end'], '%Y-%m-%d').date()
-                self.highlighted_dates.append({
-                    'start': start, 'end': end, 'color': date_range['color']
-                })
+        self.progress_width_percent = settings.progress_width_percent
+        self.progress_height = settings.progress_height
+        self.progress_margin = settings.progress_margin
+        self.progress_position = settings.progress_position
+        
+        # Дни для выделения (даты разобраны компилятором)
+        self.highlighted_dates = [
+            {'start': start, 'end': end, 'color': color}
+            for start, end, color in settings.highlighted_ranges
+        ]
+        
+        self.output_path = settings.output
+        
+        # Прогресс-бар всегда в 120px от нижнего края
+        self.progress_y = self.height - 120
         
         print(f"✅ Настройки фразы:")
         print(f"   Отступы: ↑{self.quote_margin_top}px ↓{self.quote_margin_bottom}px ←{self.quote_margin_left}px →{self.quote_margin_right}px")
@@ -224,7 +341,15 @@ class CalendarGenerator:
             print("⚠ Нет доступных шрифтов, будет использован стандартный")
     
     def get_font(self, size, font_type="regular"):
-        """Получение шрифта с поддержкой кириллицы"""
+        """Получение шрифта с кэшем по размеру"""
+        font = self.font_cache.get(size)
+        if font is None:
+            font = self.load_font(size)
+            self.font_cache[size] = font
+        return font
+    
+    def load_font(self, size):
+        """Загрузка шрифта с поддержкой кириллицы"""
         # Список шрифтов в порядке приоритета
         font_paths = [
             # Шрифты Microsoft (Arial)
@@ -345,69 +470,36 @@ class CalendarGenerator:
         
         return self.quotes_list[quote_index_list]
     
-    def get_day_color(self, day_date: date) -> str:
-        """Определение цвета для конкретного дня"""
-        for date_range in self.highlighted_dates:
+    def get_day_role(self, day_date: date) -> str:
+        """Семантическая роль кружка дня: highlight:N, current_day, past_day или future_day"""
+        for i, date_range in enumerate(self.highlighted_dates):
             if date_range['start'] <= day_date <= date_range['end']:
-                return date_range['color']
+                return f"highlight:{i}"
         
         if day_date == self.today:
-            return self.colors['current_day']
+            return 'current_day'
         
         if day_date < self.today:
-            return self.colors['past_day']
+            return 'past_day'
         
-        return self.colors['future_day']
+        return 'future_day'
     
-    def calculate_quote_height(self):
-        """Расчет высоты фразы в пикселях"""
-        if not self.quote_enabled or not self.selected_quote:
-            return 0
-        
-        temp_image = Image.new('RGB', (self.width, 100), color='black')
-        temp_draw = ImageDraw.Draw(temp_image)
-        
-        font = self.get_font(self.quote_font_size)
-        
-        left_boundary = self.quote_margin_left
-        right_boundary = self.width - self.quote_margin_right
-        available_width = right_boundary - left_boundary
-        
-        max_text_width = min(self.quote_max_width, available_width)
-        
-        lines = []
-        for paragraph in self.selected_quote.split('\n'):
-            wrapped = textwrap.wrap(
-                paragraph, 
-                width=int(max_text_width // (self.quote_font_size * 0.6))
-            )
-            lines.extend(wrapped)
-        
-        line_height = int(self.quote_font_size * self.quote_line_height)
-        total_height = len(lines) * line_height
-        
-        total_quote_area_height = self.quote_margin_top + total_height + self.quote_margin_bottom
-        
-        return total_quote_area_height
+    def role_color(self, role: str) -> Tuple[int, int, int]:
+        """Цвет семантической роли по текущему конфигу"""
+        if role.startswith('highlight:'):
+            return self.highlighted_dates[int(role.split(':', 1)[1])]['color']
+        if role == 'quote':
+            return self.quote_color
+        return self.colors[role]
     
-    def draw_quote(self, draw: ImageDraw):
-        """Отрисовка фразы дня в верхней части экрана"""
-        if not self.quote_enabled or not self.selected_quote:
-            print("⚠ Фраза дня не будет отрисована (отключена или пустая)")
-            return
-        
-        print(f"🎨 Начинаю отрисовку фразы: {self.selected_quote[:50]}...")
-        
-        font = self.get_font(self.quote_font_size)
-        
+    def wrap_quote_lines(self) -> List[str]:
+        """Перенос фразы дня на строки по ширине текстовой области"""
         left_boundary = self.quote_margin_left
         right_boundary = self.width - self.quote_margin_right
         available_width = right_boundary - left_boundary
         
         max_text_width = min(self.quote_max_width, available_width)
         
-        print(f"📏 Параметры отрисовки: ширина={max_text_width}px, шрифт={self.quote_font_size}px")
-        
         lines = []
         for paragraph in self.selected_quote.split('\n'):
             try:
@@ -420,22 +512,45 @@ class CalendarGenerator:
                 print(f"⚠ Ошибка при переносе текста: {e}")
                 lines.append(paragraph)
         
-        print(f"📝 Текст разбит на {len(lines)} строк")
+        return lines
+    
+    def day_text_color(self, day_color: Tuple[int, int, int]) -> str:
+        """Цвет номера дня поверх кружка: белый или черный, что контрастнее по WCAG"""
+        luminance = relative_luminance(day_color)
+        contrast_white = 1.05 / (luminance + 0.05)
+        contrast_black = (luminance + 0.05) / 0.05
+        return 'white' if contrast_white >= contrast_black else 'black'
+    
+    def calculate_quote_height(self):
+        """Расчет высоты фразы в пикселях"""
+        if not self.quote_enabled or not self.selected_quote:
+            return 0
+        
+        lines = self.wrap_quote_lines()
         
         line_height = int(self.quote_font_size * self.quote_line_height)
         total_height = len(lines) * line_height
         
+        total_quote_area_height = self.quote_margin_top + total_height + self.quote_margin_bottom
+        
+        return total_quote_area_height
+    
+    def layout_quote(self, font) -> List[Tuple[int, int, str]]:
+        """Позиции строк фразы дня: список (x, y, строка) без отрисовки"""
+        lines = self.wrap_quote_lines()
+        
+        line_height = int(self.quote_font_size * self.quote_line_height)
+        
         y_start = self.quote_margin_top
         
         text_area_left = self.quote_margin_left
         text_area_right = self.width - self.quote_margin_right
         text_area_width = text_area_right - text_area_left
         
-        print(f"📍 Позиция: x=[{text_area_left}-{text_area_right}], y={y_start}")
-        
+        positions = []
         for i, line in enumerate(lines):
             try:
-                bbox = draw.textbbox((0, 0), line, font=font)
+                bbox = font.getbbox(line)
                 line_width = bbox[2] - bbox[0]
             except Exception as e:
                 print(f"⚠ Ошибка при измерении строки '{line[:20]}...': {e}")
@@ -460,47 +575,26 @@ class CalendarGenerator:
             elif x + line_width > text_area_right:
                 x = text_area_right - line_width
             
-            try:
-                draw.text(
-                    (x, y_start + i * line_height),
-                    line,
-                    fill=self.quote_color,
-                    font=font
-                )
-                print(f"  ✓ Строка {i+1}: '{line[:30]}...' на позиции ({x}, {y_start + i * line_height})")
-            except Exception as e:
-                print(f"❌ Ошибка при отрисовке строки {i+1}: {e}")
-                try:
-                    draw.text(
-                        (x, y_start + i * line_height),
-                        "Фраза дня",
-                        fill=self.quote_color,
-                        font=font
-                    )
-                except:
-                    pass
-        
-        if self.quote_show_number and len(self.quotes_list) > 1:
-            number_text = f"Фраза {self.quote_index}/{len(self.quotes_list)}"
-            small_font = self.get_font(self.quote_font_size // 2)
-            
-            try:
-                number_bbox = draw.textbbox((0, 0), number_text, font=small_font)
-                number_width = number_bbox[2] - number_bbox[0]
-                
-                number_x = self.width - number_width - self.quote_margin_right
-                number_y = y_start + total_height + 5
-                
-                draw.text(
-                    (number_x, number_y),
-                    number_text,
-                    fill=self.quote_color,
-                    font=small_font
-                )
-            except Exception as e:
-                print(f"⚠ Не удалось нарисовать номер фразы: {e}")
+            positions.append((x, y_start + i * line_height, line))
+        
+        return positions
+    
+    def layout_quote_number(self, small_font) -> Optional[Tuple[int, int, str]]:
+        """Позиция номера фразы (x, y, текст) или None, если номер не показывается"""
+        if not self.quote_show_number or len(self.quotes_list) <= 1:
+            return None
+        
+        number_text = f"Фраза {self.quote_index}/{len(self.quotes_list)}"
+        number_bbox = small_font.getbbox(number_text)
+        number_width = number_bbox[2] - number_bbox[0]
         
-        print(f"✅ Фраза отрисована успешно")
+        line_height = int(self.quote_font_size * self.quote_line_height)
+        total_height = len(self.wrap_quote_lines()) * line_height
+        
+        number_x = self.width - number_width - self.quote_margin_right
+        number_y = self.quote_margin_top + total_height + 5
+        
+        return number_x, number_y, number_text
     
     def calculate_month_dimensions(self):
         """РАСЧЕТ РАЗМЕРОВ И ПОЛОЖЕНИЯ МЕСЯЦЕВ"""
@@ -522,61 +616,29 @@ class CalendarGenerator:
         
         return cols, rows, month_width, month_height
     
-    def draw_month(self, draw: ImageDraw, month_idx: int, 
-                   x0: int, y0: int, width: int, height: int):
-        """Отрисовка одного месяца"""
-        month_name = self.months[month_idx]
-        
-        # Получаем шрифт с поддержкой кириллицы
-        font = self.get_font(self.config['fonts']['month_size'])
+    def month_origin(self, month_idx: int, cols: int,
+                     month_width: int, month_height: int) -> Tuple[int, int]:
+        """Левый верхний угол ячейки месяца"""
+        col = month_idx % cols
+        row = month_idx // cols
         
-        # Отладочная информация
-        print(f"📝 Месяц {month_idx+1}: '{month_name}' (длина: {len(month_name)}, байты: {month_name.encode('utf-8')})")
+        x0 = self.month_margin_x + col * (month_width + self.month_spacing_x)
+        y0 = self.effective_top_offset + self.month_margin_y + row * (month_height + self.month_spacing_y)
         
+        return x0, y0
+    
+    def month_label_position(self, x0: int, y0: int, width: int) -> Tuple[int, int, str]:
+        """Точка привязки и anchor названия месяца"""
         if self.month_text_align == 'center':
-            text_x = x0 + width // 2
-            anchor = "mm"
+            return x0 + width // 2, y0 + 40, "mm"
         elif self.month_text_align == 'right':
-            text_x = x0 + width - 20
-            anchor = "rm"
+            return x0 + width - 20, y0 + 40, "rm"
         else:  # left (default)
-            text_x = x0 + 20
-            anchor = "lm"
-        
-        # Тестируем шрифт перед отрисовкой
-        try:
-            test_bbox = font.getbbox(month_name)
-            print(f"📏 Шрифт поддерживает кириллицу: '{month_name}' размер {test_bbox[2]-test_bbox[0]}x{test_bbox[3]-test_bbox[1]}")
-        except:
-            print(f"⚠ Шрифт не поддерживает кириллицу для '{month_name}'")
-        
-        try:
-            draw.text(
-                (text_x, y0 + 40),
-                month_name,
-                fill=self.colors['month_text'],
-                font=font,
-                anchor=anchor
-            )
-            print(f"✅ Месяц '{month_name}' отрисован успешно")
-        except Exception as e:
-            print(f"❌ Ошибка при отрисовке месяца '{month_name}': {e}")
-            # Fallback: используем латинское название
-            fallback_names = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", 
-                            "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
-            fallback_name = fallback_names[month_idx]
-            try:
-                draw.text(
-                    (text_x, y0 + 40),
-                    fallback_name,
-                    fill=self.colors['month_text'],
-                    font=font,
-                    anchor=anchor
-                )
-                print(f"⚠ Использовано латинское название: {fallback_name}")
-            except:
-                pass
-        
+            return x0 + 20, y0 + 40, "lm"
+    
+    def layout_days(self, month_idx: int, x0: int, y0: int,
+                    width: int) -> List[Tuple[date, int, int]]:
+        """Центры кружков дней месяца: список (дата, x, y)"""
         cols = 7
         rows = 6
         
@@ -592,7 +654,7 @@ class CalendarGenerator:
         try:
             month_date = date(self.year, month_idx + 1, 1)
         except ValueError:
-            return
+            return []
         
         if month_idx == 11:
             next_month = date(self.year + 1, 1, 1)
@@ -606,6 +668,7 @@ class CalendarGenerator:
         if self.week_start > 0:
             first_weekday = (first_weekday - self.week_start) % 7
         
+        cells = []
         for day in range(1, days_in_month + 1):
             current_date = date(self.year, month_idx + 1, day)
             
@@ -618,36 +681,12 @@ class CalendarGenerator:
             center_x = grid_start_x + self.day_radius + col * self.day_spacing_x
             center_y = grid_start_y + self.day_radius + row * self.day_spacing_y
             
-            color = self.get_day_color(current_date)
-            
-            draw.ellipse(
-                [
-                    center_x - self.day_radius,
-                    center_y - self.day_radius,
-                    center_x + self.day_radius,
-                    center_y + self.day_radius
-                ],
-                fill=color
-            )
-            
-            if self.show_numbers:
-                day_font = self.get_font(self.config['fonts']['day_size'])
-                
-                if color in ['#90EE90', '#4CAF50', '#FF9800', '#2196F3', '#F44336']:
-                    text_color = 'white'
-                else:
-                    text_color = 'black'
-                
-                draw.text(
-                    (center_x, center_y),
-                    str(day),
-                    fill=text_color,
-                    font=day_font,
-                    anchor="mm"
-                )
+            cells.append((current_date, center_x, center_y))
+        
+        return cells
     
-    def draw_progress(self, draw: ImageDraw, y_position: int):
-        """Отрисовка прогресс-бара"""
+    def layout_progress(self, y_position: int, font) -> Tuple[int, int, int, int, int, int, str]:
+        """Геометрия прогресс-бара: (bar_x, bar_y, bar_width, filled_width, text_x, text_y, текст)"""
         bar_width = int(self.width * (self.progress_width_percent / 100))
         
         if self.progress_position == 'left':
@@ -659,59 +698,96 @@ class CalendarGenerator:
         
         bar_y = y_position
         
-        draw.rectangle(
-            [bar_x, bar_y, bar_x + bar_width, bar_y + self.progress_height],
-            fill=self.colors['progress_background']
-        )
-        
         filled_width = int(bar_width * (self.progress_percent / 100))
-        draw.rectangle(
-            [bar_x, bar_y, bar_x + filled_width, bar_y + self.progress_height],
-            fill=self.colors['progress_fill']
-        )
-        
-        font = self.get_font(self.config['fonts']['progress_size'])
         
         progress_text = f"{self.progress_percent}%"
-        text_bbox = draw.textbbox((0, 0), progress_text, font=font)
+        text_bbox = font.getbbox(progress_text)
         text_height = text_bbox[3] - text_bbox[1]
         
         text_x = bar_x + bar_width + 10
         text_y = bar_y + (self.progress_height - text_height) // 2
         
-        draw.text(
-            (text_x, text_y),
-            progress_text,
-            fill=self.colors['progress_text'],
-            font=font
-        )
+        return bar_x, bar_y, bar_width, filled_width, text_x, text_y, progress_text
     
-    def generate(self) -> str:
-        """Генерация полного изображения календаря"""
-        print("🚀 Начинаю генерацию изображения...")
-        
-        image = Image.new('RGB', (self.width, self.height), 
-                         color=self.colors['background'])
-        draw = ImageDraw.Draw(image)
+    def build_display_list(self) -> DisplayList:
+        """Компиляция раскладки в список отрисовки (кэшируется на генераторе)"""
+        if self.display_list is None:
+            self.display_list = compile_display_list(self)
+            print(f"🧾 Список отрисовки: {len(self.display_list.items)} примитивов")
+        return self.display_list
+    
+    def render(self) -> Image.Image:
+        """Отрисовка календаря в изображение без сохранения"""
+        return rasterize(self.build_display_list(), self.get_font)
+    
+    def frame_cache_path(self, output_path: str) -> str:
+        """Файл с прошлым списком отрисовки для данного изображения"""
+        directory = os.path.dirname(os.path.abspath(output_path))
+        return os.path.join(directory, CACHE_DIR_NAME,
+                            os.path.basename(output_path) + ".frame.pickle")
+    
+    def render_incremental(self, output_path: str) -> Optional[Image.Image]:
+        """Перерисовка только изменившихся областей прошлого кадра.
         
-        self.draw_quote(draw)
+        Возвращает None, если кадр не изменился и сохранять нечего,
+        иначе готовое изображение (частично или полностью перерисованное).
+        """
+        display_list = self.build_display_list()
+        try:
+            with open(self.frame_cache_path(output_path), 'rb') as f:
+                previous, png_digest = pickle.load(f)
+            with open(output_path, 'rb') as f:
+                png_bytes = f.read()
+        except (OSError, pickle.PickleError, EOFError, ValueError, TypeError, AttributeError):
+            return self.render()
+        
+        # Прошлый кадр годится, только если PNG на диске — именно он
+        if hashlib.sha256(png_bytes).hexdigest() != png_digest:
+            return self.render()
+        
+        dirty = diff_display_lists(previous, display_list)
+        if not dirty:
+            print("⚡ Список отрисовки не изменился, перерисовка не нужна")
+            self.render_mode = 'skipped'
+            return None
+        
+        area = sum((x1 - x0 + 1) * (y1 - y0 + 1) for x0, y0, x1, y1 in dirty)
+        if area * 2 > self.width * self.height:
+            return self.render()
+        
+        self.render_mode = 'partial'
+        print(f"⚡ Перерисовываю {len(dirty)} областей ({area / (self.width * self.height):.1%} кадра)")
+        image = Image.open(io.BytesIO(png_bytes)).convert('RGB')
+        return repaint(image, display_list, self.get_font, dirty)
+    
+    def save_frame(self, output_path: str):
+        """Запоминание списка отрисовки и хэша PNG для следующего запуска"""
+        cache_path = self.frame_cache_path(output_path)
+        try:
+            with open(output_path, 'rb') as f:
+                png_digest = hashlib.sha256(f.read()).hexdigest()
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            with open(cache_path, 'wb') as f:
+                pickle.dump((self.display_list, png_digest), f, protocol=pickle.HIGHEST_PROTOCOL)
+        except OSError as e:
+            print(f"⚠ Не удалось сохранить список отрисовки: {e}")
+    
+    def generate(self, incremental: bool = True) -> str:
+        """Генерация полного изображения календаря.
         
-        cols, rows, month_width, month_height = self.calculate_month_dimensions()
+        При incremental=True перерисовываются только области, изменившиеся
+        с прошлого запуска, а при неизменном кадре PNG не перезаписывается.
+        """
+        print("🚀 Начинаю генерацию изображения...")
         
-        print(f"📅 Отрисовываю 12 месяцев...")
-        for i in range(12):
-            col = i % cols
-            row = i // cols
-            
-            x0 = self.month_margin_x + col * (month_width + self.month_spacing_x)
-            y0 = self.effective_top_offset + self.month_margin_y + row * (month_height + self.month_spacing_y)
-            
-            self.draw_month(draw, i, x0, y0, month_width, month_height)
+        output_path = self.output_path
         
-        progress_y = self.height - 120
-        self.draw_progress(draw, progress_y)
+        self.render_mode = 'full'
+        image = self.render_incremental(output_path) if incremental else self.render()
+        if image is None:
+            print(f"✅ Изображение актуально: {output_path}")
+            return output_path
         
-        output_path = self.config.get('output', 'calendar.png')
         
         try:
             image.save(output_path, "PNG")
@@ -720,6 +796,9 @@ class CalendarGenerator:
             file_size = os.path.getsize(output_path)
             print(f"📏 Размер файла: {file_size:,} байт")
             
+            if incremental:
+                self.save_frame(output_path)
+            
         except Exception as e:
             print(f"❌ Ошибка при сохранении изображения: {e}")
             output_path = "calendar_backup.png"
@@ -733,91 +812,81 @@ class CalendarGenerator:
         
         return output_path
     
-    def create_default_config(self):
+    def create_default_config(self, config_path: str = DEFAULT_CONFIG_PATH):
         """Создание конфигурационного файла по умолчанию"""
-        config = {
-            "display": {
-                "width": 1320,
-                "height": 2868
-            },
-            "layout": {
-                "top_offset": 300,
-                "day_radius": 22,
-                "month_spacing_x": 30,
-                "month_spacing_y": 40,
-                "month_margin_x": 40,
-                "month_margin_y": 20,
-                "day_spacing_x": 50,
-                "day_spacing_y": 50,
-                "day_grid_padding_x": 20,
-                "day_grid_padding_y": 80
-            },
-            "colors": {
-                "background": "#000000",
-                "month_text": "#FFFFFF",
-                "future_day": "#333333",
-                "past_day": "#FFFFFF",
-                "current_day": "#90EE90",
-                "progress_background": "#333333",
-                "progress_fill": "#4CAF50",
-                "progress_text": "#FFFFFF"
-            },
-            "calendar": {
-                "months": [
-                    "Янв", "Фев", "Мар", "Апр",
-                    "Май", "Июн", "Июл", "Авг",
-                    "Сен", "Окт", "Ноя", "Дек"
-                ],
-                "week_start": 0,
-                "show_numbers": False,
-                "month_text_align": "left"
-            },
-            "quote": {
-                "enabled": True,
-                "text": "Сегодня — идеальный день, чтобы сделать шаг к мечте",
-                "quotes": [
-                    "Маленькие шаги каждый день приводят к большим результатам",
-                    "Успех — это сумма маленьких усилий, повторяющихся изо дня в день",
-                    "Лучший способ предсказать будущее — создать его",
-                    "Не откладывай на завтра то, что можешь сделать сегодня",
-                    "Каждый день — новая возможность изменить свою жизнь"
-                ],
-                "font_size": 42,
-                "color": "#FFFFFF",
-                "align": "center",
-                "position": "above_calendar",
-                "margin_top": 40,
-                "margin_bottom": 20,
-                "margin_left": 60,
-                "margin_right": 60,
-                "max_width": 1200,
-                "line_height": 1.2,
-                "show_number": False
-            },
-            "fonts": {
-                "month_size": 48,
-                "day_size": 20,
-                "progress_size": 36
-            },
-            "progress": {
-                "width_percent": 30,
-                "height": 40,
-                "margin": 20,
-                "position": "center"
-            },
-            "highlighted_ranges": [],
-            "output": "calendar.png"
-        }
-        
-        with open("config.json", "w", encoding='utf-8') as f:
+        config = default_config()
+        
+        with open(config_path, "w", encoding='utf-8') as f:
             json.dump(config, f, indent=2, ensure_ascii=False)
         
-        print("✅ Создан config.json с настройками по умолчанию")
-        print("⚠ ВНИМАНИЕ: Убедитесь, что config.json сохранен в кодировке UTF-8")
+        print(f"✅ Создан {config_path} с настройками по умолчанию")
+        print(f"⚠ ВНИМАНИЕ: Убедитесь, что {config_path} сохранен в кодировке UTF-8")
         return config
 
-def main():
+def positive_int(value: str) -> int:
+    """Тип argparse: целое число не меньше 1"""
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"ожидалось целое число, получено '{value}'")
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"должно быть не меньше 1, получено {number}")
+    return number
+
+def parse_args(argv=None):
+    """Разбор аргументов командной строки"""
+    parser = argparse.ArgumentParser(description="Генератор прогрессивного календаря для iPhone")
+    parser.add_argument("--config",
+                        help=f"путь к конфигу (JSON или JSONC); без флага используется "
+                             f"{DEFAULT_CONFIG_PATH}, который создается при отсутствии")
+    parser.add_argument("--check", action="store_true",
+                        help="только проверить раскладку без отрисовки (код выхода 1 при проблемах)")
+    parser.add_argument("--svg", metavar="PATH", nargs="?", const="",
+                        help="дополнительно записать векторный SVG (по умолчанию рядом с PNG)")
+    parser.add_argument("--stream", action="store_true",
+                        help="рисовать полосами с потоковой записью PNG (для очень больших размеров)")
+    parser.add_argument("--strip-height", type=positive_int, default=256,
+                        help="высота полосы для --stream в пикселях (по умолчанию 256)")
+    parser.add_argument("--variants", action="store_true",
+                        help="дополнительно записать цветовые темы из секции themes конфига")
+    parser.add_argument("--bulk", metavar="JSONL",
+                        help="массовая генерация: переопределения пользователей построчно ('-' — stdin)")
+    parser.add_argument("--out-dir", default="bulk_output",
+                        help="каталог результатов --bulk (по умолчанию bulk_output)")
+    parser.add_argument("--workers", type=positive_int, default=None,
+                        help="число процессов для --bulk (по умолчанию по числу CPU)")
+    return parser.parse_args(argv)
+
+def open_generator(args) -> CalendarGenerator:
+    """Генератор по конфигу из аргументов; при ошибке конфига — выход с кодом 1.
+    
+    Конфиг по умолчанию создается только при обычном запуске без --config:
+    явно указанный файл и --check никогда не перезаписываются.
+    """
+    config_path = args.config or DEFAULT_CONFIG_PATH
+    create_missing = args.config is None and not args.check
+    try:
+        return CalendarGenerator(config_path, create_missing=create_missing)
+    except ConfigError:
+        # Подробности уже напечатаны при загрузке конфига
+        sys.exit(1)
+
+def main(argv=None):
     """Основная функция"""
+    args = parse_args(argv)
+    
+    if args.bulk:
+        from bulk_render import run_bulk
+        
+        sys.exit(0 if run_bulk(args.config or DEFAULT_CONFIG_PATH, args.bulk,
+                               args.out_dir, args.workers) else 1)
+    
+    if args.check:
+        from layout_check import run_check
+        
+        generator = open_generator(args)
+        sys.exit(0 if run_check(generator) else 1)
+    
     print("=" * 60)
     print("🚀 ЗАПУСК ГЕНЕРАЦИИ КАЛЕНДАРЯ")
     print("=" * 60)
@@ -825,8 +894,42 @@ def main():
     print(f"🐍 Python версия: {sys.version}")
     print(f"📁 Рабочая директория: {os.getcwd()}")
     
-    generator = CalendarGenerator()
-    output_file = generator.generate()
+    generator = open_generator(args)
+    # Раскладка компилируется до замеров: PNG и SVG исполняют один и тот же список
+    generator.build_display_list()
+    png_started = time.perf_counter()
+    if args.stream:
+        from streaming_render import render_streaming
+        
+        output_file = render_streaming(generator, generator.output_path, args.strip_height)
+    else:
+        output_file = generator.generate()
+    png_seconds = time.perf_counter() - png_started
+    
+    if args.variants:
+        from theme_variants import render_variants
+        
+        render_variants(generator)
+    
+    if args.svg is not None:
+        from svg_backend import render_svg
+        
+        svg_path = args.svg or os.path.splitext(output_file)[0] + ".svg"
+        svg_started = time.perf_counter()
+        svg_path, svg_size = render_svg(generator, svg_path)
+        svg_seconds = time.perf_counter() - svg_started
+        png_size = os.path.getsize(output_file)
+        print(f"✅ SVG сохранен: {svg_path}")
+        if args.stream or generator.render_mode == 'full':
+            print(f"📏 PNG: {png_size:,} байт за {png_seconds * 1000:.0f} мс, "
+                  f"SVG: {svg_size:,} байт за {svg_seconds * 1000:.0f} мс "
+                  f"({svg_size / png_size:.0%} от PNG)")
+        else:
+            # Время PNG без полной перерисовки не сравнимо со временем SVG
+            reason = "кадр актуален" if generator.render_mode == 'skipped' else "перерисованы только изменения"
+            print(f"📏 PNG: {png_size:,} байт ({reason}, время не сравнивается), "
+                  f"SVG: {svg_size:,} байт за {svg_seconds * 1000:.0f} мс "
+                  f"({svg_size / png_size:.0%} от PNG)")
     
     with open("index.html", "w", encoding="utf-8") as f:
         f.write(f"""<!DOCTYPE html>
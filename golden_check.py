@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Регрессионная проверка рендера по эталонным изображениям
+
+Рисует фиксированный набор конфигов на фиксированные даты (дата
+передается в генератор явно, date.today() не используется) и сравнивает
+результат с эталонными PNG через разность массивов NumPy. Допуски
+задаются по областям из списка отрисовки: текст может слегка
+отличаться сглаживанием, фон, кружки и полосы прогресса — нет.
+При расхождении рядом сохраняются фактический рендер и картинка-разность
+с подсвеченными пикселями. Случаи DRIFT_CASES проверяют саму проверку:
+едва заметная перекраска одной роли обязана не пройти.
+
+Шрифт зафиксирован (GOLDEN_FONT), а не ищется по списку генератора:
+иначе на машине с Arial, как в CI, рендер шел бы другим шрифтом.
+Эталоны лежат в golden/<шрифт>/. Нужен numpy: pip install -r requirements-dev.txt
+
+    python golden_check.py              # проверить все случаи
+    python golden_check.py --update     # перезаписать эталоны
+    python golden_check.py leap_year    # только выбранные случаи
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+from datetime import date
+from typing import Dict, List, NamedTuple, Tuple
+
+from PIL import Image, ImageFont
+
+from config_compiler import compile_config_data, deep_merge
+from display_list import Text
+from generate_calendar import CalendarGenerator, default_config
+
+try:
+    import numpy as np
+except ImportError:  # numpy нужен только для проверки, не для генерации
+    np = None
+
+GOLDEN_DIR = "golden"
+FAILURES_DIR_NAME = "_failures"
+
+# Шрифт, которым нарисованы эталоны (пакет fonts-dejavu)
+GOLDEN_FONT = "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf"
+
+
+class GoldenCase(NamedTuple):
+    """Случай проверки: переопределения поверх default_config() и отображаемая дата"""
+    name: str
+    today: date
+    overrides: Dict
+
+
+CASES: List[GoldenCase] = [
+    GoldenCase("default_midyear", date(2026, 6, 15), {}),
+    GoldenCase("numbers_monday_start", date(2026, 1, 1), {
+        "calendar": {"show_numbers": True, "week_start": 1, "month_text_align": "center"},
+        "quote": {"show_number": True, "align": "left"},
+        "progress": {"position": "right"},
+    }),
+    GoldenCase("leap_year_highlights", date(2028, 2, 29), {
+        "year": 2028,
+        "quote": {"position": "top_right", "quotes": ["Один", "Два", "Три"]},
+        "highlighted_ranges": [
+            {"date": "2028-01-07", "color": "#FF9800"},
+            {"start": "2028-03-01", "end": "2028-03-10", "color": "#2196F3"},
+        ],
+    }),
+    GoldenCase("year_end_no_quote", date(2026, 12, 31), {
+        "quote": {"enabled": False},
+        "calendar": {"month_text_align": "right"},
+        "progress": {"position": "left", "width_percent": 50},
+    }),
+]
+
+
+class DriftCase(NamedTuple):
+    """Перекраска одной роли поверх случая base: сравнение с эталоном base обязано упасть"""
+    name: str
+    base: str
+    overrides: Dict
+
+
+DRIFT_CASES: List[DriftCase] = [
+    DriftCase("future_day_drift", "default_midyear", {"colors": {"future_day": "#363636"}}),
+    DriftCase("past_day_drift", "leap_year_highlights", {"colors": {"past_day": "#FCFCFC"}}),
+    DriftCase("current_day_drift", "numbers_monday_start", {"colors": {"current_day": "#94EE90"}}),
+    DriftCase("progress_fill_drift", "year_end_no_quote", {"colors": {"progress_fill": "#4CAF53"}}),
+]
+
+# Область -> (порог разницы канала, допустимая доля пикселей выше порога)
+REGION_TOLERANCES: Dict[str, Tuple[int, float]] = {
+    'background': (0, 0.0),
+    'shapes': (0, 0.0),  # кружки дней и полосы прогресса
+    'quote': (48, 0.002),
+    'month': (48, 0.001),  # названия месяцев и номера дней
+    'progress': (48, 0.002),
+}
+REGIONS = list(REGION_TOLERANCES)
+
+# Роль текста в списке отрисовки -> область допуска
+TEXT_REGIONS = {'quote': 'quote', 'month_text': 'month', 'day_number': 'month',
+                'progress_text': 'progress'}
+
+# Запас вокруг рамок элементов на сглаживание, пиксели
+REGION_MARGIN = 2
+
+
+class GoldenGenerator(CalendarGenerator):
+    """Генератор с зафиксированным шрифтом: эталоны не зависят от шрифтов системы"""
+    font_cache: Dict[int, object] = {}
+
+    def load_font(self, size):
+        return ImageFont.truetype(GOLDEN_FONT, size)
+
+
+def render_case(case: GoldenCase) -> Tuple[Image.Image, CalendarGenerator]:
+    """Рендер случая в память без подробного лога генератора"""
+    settings = compile_config_data(deep_merge(default_config(), case.overrides))
+    with contextlib.redirect_stdout(io.StringIO()):
+        generator = GoldenGenerator(settings=settings, today=case.today)
+        image = generator.render()
+    return image, generator
+
+
+def font_key(generator: CalendarGenerator) -> str:
+    """Имя шрифта, которым рисует генератор, — ключ каталога эталонов"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        font = generator.get_font(generator.month_font_size)
+    path = getattr(font, 'path', None)
+    return os.path.splitext(os.path.basename(path))[0] if path else "default"
+
+
+def region_mask(generator: CalendarGenerator) -> "np.ndarray":
+    """Маска H×W с индексом области REGIONS для каждого пикселя.
+
+    Сначала размечаются фигуры (без допуска), поверх них — рамки текста
+    с запасом на сглаживание, в том числе номера дней внутри кружков.
+    """
+    mask = np.zeros((generator.height, generator.width), dtype=np.uint8)
+    with contextlib.redirect_stdout(io.StringIO()):
+        items = generator.build_display_list().items
+    shapes = REGIONS.index('shapes')
+    for item in items:
+        if not isinstance(item, Text):
+            x0, y0, x1, y1 = item.bbox
+            mask[max(y0, 0):y1 + 1, max(x0, 0):x1 + 1] = shapes
+    for item in items:
+        if isinstance(item, Text):
+            x0, y0, x1, y1 = item.bbox
+            region = TEXT_REGIONS[item.role.split(':', 1)[0]]
+            mask[max(y0 - REGION_MARGIN, 0):y1 + REGION_MARGIN,
+                 max(x0 - REGION_MARGIN, 0):x1 + REGION_MARGIN] = REGIONS.index(region)
+    return mask
+
+
+def compare(actual: Image.Image, reference: Image.Image,
+            mask: "np.ndarray") -> Tuple[List[str], "np.ndarray", "np.ndarray"]:
+    """Сравнение с эталоном: (список нарушений, пиксели выше порога, разность)"""
+    a = np.asarray(actual.convert('RGB'), dtype=np.int16)
+    b = np.asarray(reference.convert('RGB'), dtype=np.int16)
+    delta = np.abs(a - b).max(axis=2)
+
+    thresholds = np.array([REGION_TOLERANCES[r][0] for r in REGIONS], dtype=np.int16)
+    bad = delta > thresholds[mask]
+
+    totals = np.bincount(mask.ravel(), minlength=len(REGIONS))
+    bad_counts = np.bincount(mask[bad], minlength=len(REGIONS))
+
+    problems = []
+    for idx, region in enumerate(REGIONS):
+        if not bad_counts[idx]:
+            continue
+        fraction = bad_counts[idx] / max(totals[idx], 1)
+        if fraction > REGION_TOLERANCES[region][1]:
+            ys, xs = np.nonzero(bad & (mask == idx))
+            problems.append(f"{region}: {bad_counts[idx]} px ({fraction:.3%}) отличаются, "
+                            f"рамка [{xs.min()}, {ys.min()} – {xs.max()}, {ys.max()}]")
+    return problems, bad, delta
+
+
+def diff_image(reference: Image.Image, bad: "np.ndarray", delta: "np.ndarray") -> Image.Image:
+    """Затемненный эталон: красным — нарушения, желтым — отличия в пределах допуска"""
+    ref = np.asarray(reference.convert('L'), dtype=np.uint8) // 4
+    out = np.stack([ref, ref, ref], axis=2)
+    out[(delta > 0) & ~bad] = (255, 200, 0)
+    out[bad] = (255, 0, 0)
+    return Image.fromarray(out, 'RGB')
+
+
+def run_golden(names: List[str], update: bool = False, golden_dir: str = GOLDEN_DIR) -> bool:
+    """Проверка (или обновление) эталонов; True, если все случаи прошли"""
+    if np is None:
+        print("❌ Для проверки эталонов нужен numpy: pip install -r requirements-dev.txt")
+        return False
+    if not os.path.exists(GOLDEN_FONT):
+        print(f"❌ Нет шрифта эталонов {GOLDEN_FONT}: установите пакет fonts-dejavu")
+        return False
+
+    cases = [c for c in CASES if not names or c.name in names]
+    drifts = [d for d in DRIFT_CASES if not update and (not names or d.name in names)]
+    unknown = set(names) - {c.name for c in CASES} - {d.name for d in DRIFT_CASES}
+    if unknown:
+        print(f"❌ Неизвестные случаи: {', '.join(sorted(unknown))}")
+        return False
+
+    ok = True
+    started = time.perf_counter()
+    for case in cases:
+        case_started = time.perf_counter()
+        actual, generator = render_case(case)
+        case_dir = os.path.join(golden_dir, font_key(generator))
+        reference_path = os.path.join(case_dir, f"{case.name}.png")
+
+        if update:
+            os.makedirs(case_dir, exist_ok=True)
+            actual.save(reference_path, "PNG")
+            print(f"📝 {case.name}: эталон записан в {reference_path}")
+            continue
+
+        if not os.path.exists(reference_path):
+            print(f"❌ {case.name}: нет эталона {reference_path} (запустите с --update)")
+            ok = False
+            continue
+
+        reference = Image.open(reference_path)
+        if reference.size != actual.size:
+            print(f"❌ {case.name}: размер {actual.size} вместо {reference.size}")
+            ok = False
+            continue
+
+        problems, bad, delta = compare(actual, reference, region_mask(generator))
+        elapsed = (time.perf_counter() - case_started) * 1000
+        if not problems:
+            print(f"✅ {case.name}: совпадает ({elapsed:.0f} мс)")
+            continue
+
+        ok = False
+        failures_dir = os.path.join(golden_dir, FAILURES_DIR_NAME)
+        os.makedirs(failures_dir, exist_ok=True)
+        actual.save(os.path.join(failures_dir, f"{case.name}.actual.png"), "PNG")
+        diff_path = os.path.join(failures_dir, f"{case.name}.diff.png")
+        diff_image(reference, bad, delta).save(diff_path, "PNG")
+        print(f"❌ {case.name}: отличается от эталона ({elapsed:.0f} мс), разность: {diff_path}")
+        for problem in problems:
+            print(f"   • {problem}")
+
+    by_name = {c.name: c for c in CASES}
+    for drift in drifts:
+        base = by_name[drift.base]
+        actual, generator = render_case(base._replace(
+            name=drift.name, overrides=deep_merge(base.overrides, drift.overrides)))
+        reference_path = os.path.join(golden_dir, font_key(generator), f"{base.name}.png")
+        if not os.path.exists(reference_path):
+            print(f"❌ {drift.name}: нет эталона {reference_path} (запустите с --update)")
+            ok = False
+            continue
+        problems, _, _ = compare(actual, Image.open(reference_path), region_mask(generator))
+        if problems:
+            print(f"✅ {drift.name}: перекраска поймана ({problems[0]})")
+        else:
+            print(f"❌ {drift.name}: перекраска не обнаружена, допуски слишком широкие")
+            ok = False
+
+    print(f"⏱ {len(cases) + len(drifts)} случаев за {time.perf_counter() - started:.2f} с")
+    return ok
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Проверка рендера по эталонным изображениям")
+    parser.add_argument("cases", nargs="*", help="имена случаев (по умолчанию все)")
+    parser.add_argument("--update", action="store_true", help="перезаписать эталоны")
+    parser.add_argument("--dir", default=GOLDEN_DIR, help="каталог эталонов")
+    args = parser.parse_args(argv)
+    sys.exit(0 if run_golden(args.cases, args.update, args.dir) else 1)
+
+
+if __name__ == "__main__":
+    main()
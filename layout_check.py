@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Проверка раскладки календаря без растеризации
+
+Берет рамки элементов (строки фразы, названия месяцев, сетки дней
+вместе с номерами, прогресс-бар) из того же списка отрисовки, который
+исполняют PNG, SVG и --stream, поэтому проверка не может разойтись
+с тем, что рисуется. Рамки считаются только по метрикам шрифтов, холст
+не создается: проверка занимает миллисекунды и годится для pre-commit.
+"""
+
+from typing import Dict, List, NamedTuple, Optional
+
+from display_list import BBox, Circle, Rect
+
+
+class Box(NamedTuple):
+    """Прямоугольник элемента в пикселях, границы включительно, как BBox списка отрисовки"""
+    name: str
+    x0: int
+    y0: int
+    x1: int
+    y1: int
+    month: Optional[int] = None  # индекс месяца, которому принадлежит элемент
+
+    def __str__(self):
+        return f"{self.name} [{self.x0}, {self.y0} – {self.x1}, {self.y1}]"
+
+
+class LayoutIssue(NamedTuple):
+    """Найденная проблема раскладки"""
+    kind: str  # 'overlap', 'out_of_bounds', 'spill'
+    message: str
+
+
+def _intersects(a: Box, b: Box) -> bool:
+    return a.x0 <= b.x1 and b.x0 <= a.x1 and a.y0 <= b.y1 and b.y0 <= a.y1
+
+
+def _contains(outer: Box, inner: Box) -> bool:
+    return (outer.x0 <= inner.x0 and outer.y0 <= inner.y0 and
+            inner.x1 <= outer.x1 and inner.y1 <= outer.y1)
+
+
+def _union(a: Optional[BBox], b: BBox) -> BBox:
+    if a is None:
+        return b
+    return min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3])
+
+
+def collect_boxes(generator):
+    """Ограничивающие прямоугольники элементов из списка отрисовки генератора.
+
+    Возвращает (элементы, ячейки месяцев): элементы проверяются на пересечения
+    и выход за холст, ячейки — на то, что содержимое месяца в них помещается.
+    Кружки и номера дней месяца объединяются в одну сетку, обе полосы
+    прогресс-бара — в один бар.
+    """
+    elements: List[Box] = []
+    grids: Dict[int, BBox] = {}
+    bar: Optional[BBox] = None
+    quote_lines = 0
+
+    for item in generator.build_display_list().items:
+        if isinstance(item, Rect):
+            bar = _union(bar, item.bbox)
+        elif isinstance(item, Circle) or item.role.startswith('day_number'):
+            grids[item.month] = _union(grids.get(item.month), item.bbox)
+        elif item.role == 'month_text':
+            name = f"название месяца {item.month + 1} '{item.text.strip()}'"
+            elements.append(Box(name, *item.bbox, item.month))
+        elif item.role == 'quote':
+            if item.size == generator.quote_font_size:
+                quote_lines += 1
+                elements.append(Box(f"фраза, строка {quote_lines}", *item.bbox))
+            else:
+                elements.append(Box("номер фразы", *item.bbox))
+        else:
+            elements.append(Box("текст прогресса", *item.bbox))
+
+    for month, bbox in sorted(grids.items()):
+        elements.append(Box(f"сетка дней месяца {month + 1}", *bbox, month))
+    if bar is not None:
+        elements.append(Box("прогресс-бар", *bar))
+
+    cols, rows, month_width, month_height = generator.calculate_month_dimensions()
+    cells = []
+    for i in range(12):
+        x0, y0 = generator.month_origin(i, cols, month_width, month_height)
+        cells.append(Box(f"месяц {i+1}", x0, y0, x0 + month_width - 1, y0 + month_height - 1, i))
+
+    return elements, cells
+
+
+def check_layout(generator) -> List[LayoutIssue]:
+    """Поиск пересечений, выхода за холст и содержимого вне ячейки месяца с промежутками"""
+    elements, cells = collect_boxes(generator)
+    canvas = Box("холст", 0, 0, generator.width - 1, generator.height - 1)
+    issues: List[LayoutIssue] = []
+
+    for box in elements + cells:
+        if not _contains(canvas, box):
+            issues.append(LayoutIssue(
+                'out_of_bounds', f"{box} выходит за холст {generator.width}x{generator.height}"))
+
+    for i, a in enumerate(elements):
+        for b in elements[i + 1:]:
+            if _intersects(a, b):
+                issues.append(LayoutIssue('overlap', f"{a} пересекается с {b}"))
+
+    # Содержимое месяца может занимать промежутки до соседних ячеек: столкновение
+    # с соседом все равно поймает проверка пересечений, а край — проверка холста
+    dx, dy = generator.month_spacing_x, generator.month_spacing_y
+    for i, cell in enumerate(cells):
+        area = cell._replace(x0=cell.x0 - dx, y0=cell.y0 - dy, x1=cell.x1 + dx, y1=cell.y1 + dy)
+        for box in elements:
+            if box.month == i and not _contains(area, box):
+                issues.append(LayoutIssue(
+                    'spill', f"{box} выходит за ячейку {cell} и промежутки до соседей"))
+
+    return issues
+
+
+def run_check(generator) -> bool:
+    """Печать отчета проверки; True, если проблем нет"""
+    issues = check_layout(generator)
+    if not issues:
+        print("✅ Раскладка в порядке: пересечений и выходов за границы нет")
+        return True
+
+    print(f"❌ Найдено проблем раскладки: {len(issues)}")
+    for issue in issues:
+        print(f"   • [{issue.kind}] {issue.message}")
+    return False
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Потоковая отрисовка календаря полосами
+
+Для постеров и 8K-экранов холст целиком не создается: изображение
+рисуется горизонтальными полосами фиксированной высоты, в каждую
+полосу попадают только пересекающие ее примитивы списка отрисовки,
+а готовая полоса сразу сжимается и дописывается в PNG. Пиковая память
+зависит от высоты полосы, а не от размера изображения.
+"""
+
+import struct
+import zlib
+from typing import BinaryIO, List
+
+from PIL import Image, ImageDraw
+
+from display_list import draw_items
+
+DEFAULT_STRIP_HEIGHT = 256
+
+# Сжатый поток сбрасывается в отдельный IDAT, когда накапливается столько байт
+IDAT_CHUNK_SIZE = 1 << 16
+
+
+class PngStreamWriter:
+    """Инкрементальная запись RGB PNG: строки сжимаются по мере поступления"""
+
+    def __init__(self, out: BinaryIO, width: int, height: int):
+        self.out = out
+        self.width = width
+        self.compressor = zlib.compressobj(6)
+        self.pending = []
+        self.pending_size = 0
+        out.write(b'\x89PNG\r\n\x1a\n')
+        # 8 бит на канал, цветовой тип 2 (RGB), без чересстрочности
+        self._chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+
+    def _chunk(self, tag: bytes, data: bytes):
+        self.out.write(struct.pack('>I', len(data)))
+        self.out.write(tag)
+        self.out.write(data)
+        self.out.write(struct.pack('>I', zlib.crc32(data, zlib.crc32(tag))))
+
+    def _emit(self, data: bytes, force: bool = False):
+        if data:
+            self.pending.append(data)
+            self.pending_size += len(data)
+        if self.pending_size >= IDAT_CHUNK_SIZE or (force and self.pending_size):
+            self._chunk(b'IDAT', b''.join(self.pending))
+            self.pending = []
+            self.pending_size = 0
+
+    def write_rows(self, raw: bytes):
+        """Добавление строк полосы (сырые RGB-байты, фильтр None)"""
+        stride = self.width * 3
+        rows = b''.join(b'\x00' + raw[i:i + stride] for i in range(0, len(raw), stride))
+        self._emit(self.compressor.compress(rows))
+
+    def close(self):
+        self._emit(self.compressor.flush(), force=True)
+        self._chunk(b'IEND', b'')
+
+
+def render_streaming(generator, output_path: str,
+                     strip_height: int = DEFAULT_STRIP_HEIGHT) -> str:
+    """Отрисовка календаря полосами с потоковой записью PNG"""
+    display_list = generator.build_display_list()
+    items = display_list.items
+    width, height = display_list.width, display_list.height
+    # Примитивы входят в полосы по верхней границе, выходят по нижней;
+    # внутри полосы порядок отрисовки исходный
+    by_top = sorted(range(len(items)), key=lambda i: items[i].bbox[1])
+    next_idx = 0
+    active: List[int] = []
+
+    print(f"🧵 Потоковая отрисовка: {width}x{height}, полосы по {strip_height}px, "
+          f"{len(items)} примитивов")
+
+    with open(output_path, 'wb') as f:
+        writer = PngStreamWriter(f, width, height)
+        for strip_top in range(0, height, strip_height):
+            strip_bottom = min(strip_top + strip_height, height)
+
+            while next_idx < len(by_top) and items[by_top[next_idx]].bbox[1] < strip_bottom:
+                active.append(by_top[next_idx])
+                next_idx += 1
+            active = [i for i in active if items[i].bbox[3] >= strip_top]
+            active.sort()
+
+            strip = Image.new('RGB', (width, strip_bottom - strip_top),
+                              color=display_list.background)
+            draw_items(ImageDraw.Draw(strip), (items[i] for i in active),
+                       generator.get_font, 0, strip_top)
+            writer.write_rows(strip.tobytes())
+        writer.close()
+
+    print(f"✅ Изображение сохранено потоково: {output_path}")
+    return output_path
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Векторный вывод календаря в SVG
+
+Исполняет тот же список отрисовки (display_list), что и PNG-вывод
+CalendarGenerator.generate: фразу, названия месяцев, кружки дней
+и прогресс-бар. Кружки одного цвета описываются один раз в <defs> и повторяются
+через <use>, поэтому файл остается маленьким. Документ пишется
+в файл по мере обхода элементов, целиком в памяти не собирается.
+"""
+
+import os
+from typing import Dict, TextIO, Tuple
+from xml.sax.saxutils import escape
+
+from display_list import Circle, DisplayList, FontLoader, Rect
+
+
+def _hex(color) -> str:
+    """RGB-кортеж или имя цвета в атрибут fill"""
+    if isinstance(color, str):
+        return color
+    return '#%02x%02x%02x' % tuple(color[:3])
+
+
+def _font_family(font) -> str:
+    """Имя семейства шрифта для font-family"""
+    try:
+        family = font.getname()[0]
+    except AttributeError:
+        family = None
+    return f"{escape(family)}, sans-serif" if family else "sans-serif"
+
+
+def _baseline(font, y: float, vertical_anchor: str) -> float:
+    """Перевод точки привязки Pillow ('a' — верх, 'm' — середина) в базовую линию SVG"""
+    ascent, descent = font.getmetrics()
+    if vertical_anchor == 'm':
+        return y + (ascent - descent) / 2
+    return y + ascent
+
+
+class SvgWriter:
+    """Потоковая запись SVG с повторным использованием кружков по цвету"""
+
+    TEXT_ANCHORS = {'l': 'start', 'm': 'middle', 'r': 'end'}
+
+    def __init__(self, out: TextIO, width: int, height: int, radius: int):
+        self.out = out
+        self.radius = radius
+        self.circle_ids: Dict[str, str] = {}
+        out.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        # xml:space сохраняет ведущие пробелы в названиях месяцев, как в PNG
+        out.write(f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+                  f'viewBox="0 0 {width} {height}" xml:space="preserve">\n')
+
+    def rect(self, x0: int, y0: int, x1: int, y1: int, color):
+        """Прямоугольник с включительными границами, как ImageDraw.rectangle"""
+        self.out.write(f'<rect x="{x0}" y="{y0}" width="{x1 - x0 + 1}" height="{y1 - y0 + 1}" '
+                       f'fill="{_hex(color)}"/>\n')
+
+    def circle(self, cx: int, cy: int, color):
+        """Кружок дня: при первом появлении цвета описывается в <defs>"""
+        fill = _hex(color)
+        circle_id = self.circle_ids.get(fill)
+        if circle_id is None:
+            circle_id = f"c{len(self.circle_ids)}"
+            self.circle_ids[fill] = circle_id
+            # Ellipse Pillow покрывает пиксели [c - r, c + r] включительно
+            self.out.write(f'<defs><circle id="{circle_id}" cx="0.5" cy="0.5" '
+                           f'r="{self.radius + 0.5}" fill="{fill}"/></defs>\n')
+        self.out.write(f'<use href="#{circle_id}" x="{cx}" y="{cy}"/>\n')
+
+    def text(self, x: float, y: float, text: str, font, color, anchor: str = 'la'):
+        """Текст с той же точкой привязки, что и ImageDraw.text"""
+        text_anchor = self.TEXT_ANCHORS.get(anchor[0], 'start')
+        baseline = _baseline(font, y, anchor[1])
+        self.out.write(f'<text x="{x}" y="{baseline:g}" font-family="{_font_family(font)}" '
+                       f'font-size="{font.size}" fill="{_hex(color)}" '
+                       f'text-anchor="{text_anchor}">{escape(text)}</text>\n')
+
+    def close(self):
+        self.out.write('</svg>\n')
+
+
+def render_svg(generator, output_path: str) -> Tuple[str, int]:
+    """Отрисовка календаря в SVG; возвращает (путь, размер в байтах)"""
+    return write_svg(generator.build_display_list(), generator.get_font, output_path)
+
+
+def write_svg(display_list: DisplayList, get_font: FontLoader,
+              output_path: str) -> Tuple[str, int]:
+    """Исполнение списка отрисовки в SVG-файл; возвращает (путь, размер в байтах)"""
+    dl = display_list
+    with open(output_path, 'w', encoding='utf-8') as f:
+        radius = next((item.r for item in dl.items if isinstance(item, Circle)), 0)
+        svg = SvgWriter(f, dl.width, dl.height, radius)
+        svg.rect(0, 0, dl.width - 1, dl.height - 1, dl.background)
+
+        for item in dl.items:
+            if isinstance(item, Circle):
+                svg.circle(item.cx, item.cy, item.color)
+            elif isinstance(item, Rect):
+                svg.rect(item.x0, item.y0, item.x1, item.y1, item.color)
+            else:
+                svg.text(item.x, item.y, item.text, get_font(item.size), item.color,
+                         item.anchor or 'la')
+
+        svg.close()
+
+    return output_path, os.path.getsize(output_path)
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Цветовые темы календаря перекраской палитры
+
+Геометрия, текст и фраза у тем одинаковы, отличаются только цвета.
+Поэтому список отрисовки растеризуется один раз в индексированное
+изображение: каждая семантическая роль (background, past_day,
+month_text, highlight:N, progress_* ...) получает свой слот палитры,
+а сглаженные края текста — ступени перехода «роль под текстом → цвет
+текста». Тема — это только своя палитра для тех же индексов, так что
+N тем стоят одну растеризацию и N кодирований PNG. Если слотов
+не хватает (номера дней, много выделенных диапазонов), число ступеней
+текста уменьшается вдвое (16 → 8 → 4 → 2) с предупреждением в логе.
+
+Темы задаются в config.json:
+
+    "themes": {
+        "light": {"background": "#FFFFFF", "past_day": "#222222", "quote": "#000000"},
+        "oled": {"background": "#000000", "highlights": ["#FF9800"]}
+    }
+
+Ключи — роли из секции colors, плюс quote (цвет фразы) и highlights
+(один цвет на все выделенные даты или список по highlighted_ranges).
+Не указанные роли берутся из основного конфига.
+"""
+
+import os
+import re
+import time
+from typing import Dict, List, Optional, Tuple
+
+from PIL import Image, ImageDraw
+
+from config_compiler import parse_color
+from display_list import Circle, DisplayList, FontLoader, Rect
+
+RGB = Tuple[int, int, int]
+
+# Ступеней сглаживания текста на пару «текст поверх роли»; при нехватке палитры уменьшается
+TEXT_LEVELS = 16
+
+PALETTE_SIZE = 256
+
+
+class PaletteOverflow(Exception):
+    """Ролей и ступеней сглаживания больше, чем слотов в палитре"""
+
+
+class IndexedFrame:
+    """Растеризованный кадр в индексах палитры и описание слотов.
+
+    Слот — ('solid', роль) или ('ramp', роль текста, слот под текстом, ступень).
+    """
+
+    def __init__(self, display_list: DisplayList, levels: int):
+        self.levels = levels
+        self.slots: List[tuple] = [('solid', 'background')]
+        self.slot_index: Dict[tuple, int] = {self.slots[0]: 0}
+        self.image = Image.new('L', (display_list.width, display_list.height), 0)
+
+    def slot(self, key: tuple) -> int:
+        index = self.slot_index.get(key)
+        if index is None:
+            if len(self.slots) >= PALETTE_SIZE:
+                raise PaletteOverflow()
+            index = len(self.slots)
+            self.slots.append(key)
+            self.slot_index[key] = index
+        return index
+
+    def solid_base(self, index: int) -> int:
+        """Слот сплошной роли под пикселем (для ступени — слот, поверх которого она лежит)"""
+        entry = self.slots[index]
+        return entry[2] if entry[0] == 'ramp' else index
+
+    def ramp_lut(self, role: str, base: int) -> List[int]:
+        """Ступень покрытия -> слот: 0 оставляет роль под текстом"""
+        return [base] + [self.slot(('ramp', role, base, level))
+                         for level in range(1, self.levels)]
+
+
+def _draw_text(frame: IndexedFrame, item, get_font: FontLoader):
+    """Текст: покрытие глифов квантуется в ступени поверх того, что уже нарисовано"""
+    width, height = frame.image.size
+    x0, y0 = max(item.bbox[0], 0), max(item.bbox[1], 0)
+    x1, y1 = min(item.bbox[2], width), min(item.bbox[3], height)
+    if x0 >= x1 or y0 >= y1:
+        return
+
+    coverage = Image.new('L', (x1 - x0, y1 - y0), 0)
+    ImageDraw.Draw(coverage).text((item.x - x0, item.y - y0), item.text, fill=255,
+                                  font=get_font(item.size), anchor=item.anchor)
+    top = frame.levels - 1
+    levels = coverage.point([(c * top + 127) // 255 for c in range(256)])
+    mask = levels.point([0] + [255] * 255)
+    under = frame.image.crop((x0, y0, x1, y1))
+
+    low, high = under.getextrema()
+    if low == high:
+        # Под всей рамкой одна роль — перевод ступеней в слоты одной таблицей
+        lut = frame.ramp_lut(item.role, frame.solid_base(low))
+        painted = levels.point(lut + [0] * (256 - len(lut)))
+    else:
+        luts: Dict[int, List[int]] = {}
+        out = bytearray(under.tobytes())
+        for i, level in enumerate(levels.tobytes()):
+            if level:
+                base = frame.solid_base(out[i])
+                lut = luts.get(base)
+                if lut is None:
+                    lut = luts[base] = frame.ramp_lut(item.role, base)
+                out[i] = lut[level]
+        painted = Image.frombytes('L', under.size, bytes(out))
+    frame.image.paste(painted, (x0, y0), mask)
+
+
+def rasterize_indexed(display_list: DisplayList, get_font: FontLoader,
+                      levels: int = TEXT_LEVELS) -> IndexedFrame:
+    """Одна растеризация списка отрисовки в индексы ролей"""
+    while True:
+        frame = IndexedFrame(display_list, levels)
+        draw = ImageDraw.Draw(frame.image)
+        try:
+            for item in display_list.items:
+                if isinstance(item, Circle):
+                    draw.ellipse(list(item.bbox), fill=frame.slot(('solid', item.role)))
+                elif isinstance(item, Rect):
+                    draw.rectangle(list(item.bbox), fill=frame.slot(('solid', item.role)))
+                else:
+                    _draw_text(frame, item, get_font)
+            return frame
+        except PaletteOverflow:
+            if levels <= 2:
+                raise
+            levels //= 2
+            print(f"⚠ Палитра переполнена, уменьшаю сглаживание текста до {levels} ступеней")
+
+
+def theme_color(generator, theme: Dict, role: str) -> RGB:
+    """Цвет роли в теме; не заданные темой роли берутся из основного конфига"""
+    if role.startswith('highlight:'):
+        highlights = theme.get('highlights')
+        index = int(role.split(':', 1)[1])
+        if highlights and isinstance(highlights[0], tuple):
+            # Список цветов по highlighted_ranges; для лишних диапазонов — цвет из конфига
+            if index < len(highlights):
+                return highlights[index]
+        elif highlights:
+            return highlights
+    elif role in theme:
+        return theme[role]
+    return generator.role_color(role)
+
+
+def _blend(base: RGB, text: RGB, level: int, top: int) -> RGB:
+    return tuple((b * (top - level) + t * level + top // 2) // top for b, t in zip(base, text))
+
+
+def build_palette(generator, frame: IndexedFrame, theme: Dict) -> List[int]:
+    """Палитра темы для слотов кадра"""
+    solid: Dict[int, RGB] = {}
+    palette: List[int] = []
+    top = frame.levels - 1
+    for index, entry in enumerate(frame.slots):
+        if entry[0] == 'solid':
+            color = solid[index] = theme_color(generator, theme, entry[1])
+        else:
+            _, role, base, level = entry
+            base_color = solid[base]
+            if role.startswith('day_number:'):
+                # Белый или черный номер подбирается под цвет своего кружка в теме
+                circle_color = theme_color(generator, theme, role.split(':', 1)[1])
+                text_color = parse_color(generator.day_text_color(circle_color))
+            else:
+                text_color = theme_color(generator, theme, role)
+            color = _blend(base_color, text_color, level, top)
+        palette.extend(color)
+    return palette
+
+
+def variant_path(output_path: str, name: str) -> str:
+    """calendar.png + dark -> calendar-dark.png"""
+    stem, ext = os.path.splitext(output_path)
+    safe_name = re.sub(r'[^A-Za-z0-9._-]', '_', name)
+    return f"{stem}-{safe_name}{ext or '.png'}"
+
+
+def render_variants(generator, themes: Optional[Dict[str, Dict]] = None) -> List[str]:
+    """Все темы из конфига: одна растеризация и по одному кодированию PNG на тему"""
+    themes = generator.settings.themes if themes is None else themes
+    if not themes:
+        print("⚠ В конфиге нет секции themes, варианты не созданы")
+        return []
+
+    started = time.perf_counter()
+    frame = rasterize_indexed(generator.build_display_list(), generator.get_font)
+    raster_ms = (time.perf_counter() - started) * 1000
+    print(f"🎨 Растеризация в палитру: {len(frame.slots)} слотов, "
+          f"{frame.levels} ступеней текста, {raster_ms:.0f} мс")
+
+    indexed = Image.frombytes('P', frame.image.size, frame.image.tobytes())
+
+    paths = []
+    for name, theme in themes.items():
+        encode_started = time.perf_counter()
+        indexed.putpalette(build_palette(generator, frame, theme))
+        path = variant_path(generator.output_path, name)
+        indexed.save(path, "PNG")
+        encode_ms = (time.perf_counter() - encode_started) * 1000
+        print(f"✅ Тема '{name}': {path} ({os.path.getsize(path):,} байт, {encode_ms:.0f} мс)")
+        paths.append(path)
+
+    total_ms = (time.perf_counter() - started) * 1000
+    print(f"⏱ {len(paths)} тем за {total_ms:.0f} мс: одна растеризация + {len(paths)} кодирований")
+    return paths